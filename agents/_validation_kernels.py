@@ -0,0 +1,24 @@
+"""
+Numeric kernels for the validation agent, JIT-compiled with Numba when available
+"""
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+
+def _line_item_mismatches(qty: np.ndarray, price: np.ndarray, total: np.ndarray,
+                          tol: float = 0.01) -> np.ndarray:
+    """Flag line items whose quantity * unit price differs from the stated total"""
+    return np.abs(qty * price - total) > tol
+
+
+if NUMBA_AVAILABLE:
+    # fastmath is left off: missing values are NaN and must never compare true
+    line_item_mismatches = numba.njit(cache=True)(_line_item_mismatches)
+else:
+    line_item_mismatches = _line_item_mismatches
@@ -7,8 +7,9 @@ from typing import Any, Dict, List, Optional
 from pathlib import Path
 
 from agents.base_agent import BaseAgent
+from agents.validation_agent import ValidationCheck
 from models.processing_result import ProcessingResult
-from models.invoice_model import Invoice
+from models.invoice_model import Invoice, SUCCESS_STATUSES, FAILURE_STATUSES
 from config.settings import settings
 
 
@@ -149,9 +150,9 @@ class AuditAgent(BaseAgent):
         
         # Determine final status
         if invoice and invoice.processing_status:
-            if invoice.processing_status.value in ["approved", "validated"]:
+            if invoice.processing_status in SUCCESS_STATUSES:
                 audit_record["status"] = "completed_success"
-            elif invoice.processing_status.value in ["rejected", "error"]:
+            elif invoice.processing_status in FAILURE_STATUSES:
                 audit_record["status"] = "completed_failure"
             else:
                 audit_record["status"] = "completed_pending"
@@ -176,7 +177,7 @@ class AuditAgent(BaseAgent):
                 workflow_info["agents_executed"].append(agent_name)
                 
                 for item in value:
-                    if isinstance(item, dict):
+                    if isinstance(item, (dict, ValidationCheck)):
                         if item.get("status") == "error":
                             workflow_info["errors"].append({
                                 "agent": agent_name,
@@ -192,6 +193,10 @@ class AuditAgent(BaseAgent):
         if "processing_steps" in context:
             workflow_info["total_processing_steps"] = len(context["processing_steps"])
         
+        # Extraction served from the content-hash cache instead of the LLM
+        if "extraction_cache_key" in context:
+            workflow_info["extraction_replayed_from"] = context["extraction_cache_key"]
+        
         return workflow_info
     
     def _calculate_performance_metrics(self, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -252,11 +257,16 @@ class AuditAgent(BaseAgent):
         validation_results = context.get("validation_results", [])
         compliance_results = context.get("compliance_results", [])
         
-        metrics["validation_score"] = self._calculate_result_score(validation_results)
+        # The validation agent only records failed checks, so prefer its own score and check count
+        validation_score = context.get("validation_score")
+        if validation_score is None:
+            validation_score = self._calculate_result_score(validation_results)
+        metrics["validation_score"] = validation_score
         metrics["compliance_score"] = self._calculate_result_score(compliance_results)
         
         # Calculate error rate
-        total_checks = len(validation_results) + len(compliance_results)
+        validation_checks = context.get("validation_check_count", len(validation_results))
+        total_checks = validation_checks + len(compliance_results)
         error_checks = sum(1 for r in validation_results + compliance_results if r.get("status") == "error")
         
         if total_checks > 0:
@@ -2,6 +2,7 @@
 Base agent class for invoice processing system
 """
 import logging
+import threading
 import time
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
@@ -15,6 +16,11 @@ from utils.ollama_client import OllamaClient
 class BaseAgent(ABC):
     """Base class for all processing agents"""
 
+    __slots__ = (
+        "agent_type", "config", "name", "description", "timeout", "max_retries",
+        "ollama_client", "logger", "processing_stats", "_stats_lock"
+    )
+
     def __init__(self, agent_type: str, ollama_client: Optional[OllamaClient] = None):
         self.agent_type = agent_type
         self.config = AGENT_CONFIGS.get(agent_type, {})
@@ -26,6 +32,8 @@ class BaseAgent(ABC):
         self.ollama_client = ollama_client or OllamaClient()
         self.logger = logging.getLogger(f"agents.{agent_type}")
         
+        # One agent instance serves several batch worker threads, so stats updates are locked
+        self._stats_lock = threading.Lock()
         self.processing_stats = {
             "executions": 0,
             "successes": 0,
@@ -60,7 +68,8 @@ class BaseAgent(ABC):
             ProcessingResult: The processing result
         """
         start_time = time.time()
-        self.processing_stats["executions"] += 1
+        with self._stats_lock:
+            self.processing_stats["executions"] += 1
         
         result = ProcessingResult()
         result.add_processing_step(
@@ -79,12 +88,13 @@ class BaseAgent(ABC):
                 # If successful, update stats and return
                 # Note: validation/compliance errors are expected and don't indicate processing failure
                 if processing_result:
-                    self.processing_stats["successes"] += 1
                     processing_time = time.time() - start_time
-                    self.processing_stats["total_time"] += processing_time
-                    self.processing_stats["average_time"] = (
-                        self.processing_stats["total_time"] / self.processing_stats["executions"]
-                    )
+                    with self._stats_lock:
+                        self.processing_stats["successes"] += 1
+                        self.processing_stats["total_time"] += processing_time
+                        self.processing_stats["average_time"] = (
+                            self.processing_stats["total_time"] / self.processing_stats["executions"]
+                        )
                     
                     processing_result.processing_time = processing_time
                     processing_result.add_processing_step(
@@ -106,7 +116,8 @@ class BaseAgent(ABC):
                     time.sleep(1)  # Brief pause before retry
         
         # All attempts failed
-        self.processing_stats["failures"] += 1
+        with self._stats_lock:
+            self.processing_stats["failures"] += 1
         processing_time = time.time() - start_time
         result.processing_time = processing_time
         
@@ -138,11 +149,13 @@ class BaseAgent(ABC):
 
     def get_stats(self) -> Dict[str, Any]:
         """Get agent processing statistics"""
+        with self._stats_lock:
+            stats = self.processing_stats.copy()
         return {
             "agent": self.name,
             "type": self.agent_type,
             "description": self.description,
-            "stats": self.processing_stats.copy(),
+            "stats": stats,
             "config": {
                 "timeout": self.timeout,
                 "max_retries": self.max_retries
@@ -151,13 +164,14 @@ class BaseAgent(ABC):
 
     def reset_stats(self):
         """Reset processing statistics"""
-        self.processing_stats = {
-            "executions": 0,
-            "successes": 0,
-            "failures": 0,
-            "total_time": 0.0,
-            "average_time": 0.0
-        }
+        with self._stats_lock:
+            self.processing_stats = {
+                "executions": 0,
+                "successes": 0,
+                "failures": 0,
+                "total_time": 0.0,
+                "average_time": 0.0
+            }
 
     def health_check(self) -> Dict[str, Any]:
         """Perform health check of the agent"""
@@ -171,15 +185,17 @@ class BaseAgent(ABC):
         
         try:
             # Test Ollama connection
-            test_response = self.ollama_client.generate("test", model=settings.OLLAMA_MODEL)
-            health_status["ollama_connected"] = bool(test_response)
+            health_status["ollama_connected"] = self.ollama_client.ping()
         except Exception as e:
             health_status["status"] = "unhealthy"
             health_status["issues"].append(f"Ollama connection failed: {str(e)}")
         
         # Check success rate
-        if self.processing_stats["executions"] > 0:
-            success_rate = self.processing_stats["successes"] / self.processing_stats["executions"]
+        with self._stats_lock:
+            executions = self.processing_stats["executions"]
+            successes = self.processing_stats["successes"]
+        if executions > 0:
+            success_rate = successes / executions
             if success_rate < 0.5:  # Less than 50% success rate
                 health_status["status"] = "degraded"
                 health_status["issues"].append(f"Low success rate: {success_rate:.2%}")
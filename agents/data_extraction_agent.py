@@ -9,6 +9,71 @@ from typing import Any, Dict, List, Optional, Union
 from agents.base_agent import BaseAgent
 from models.processing_result import ProcessingResult
 from models.invoice_model import Invoice, InvoiceLineItem, Address, TaxDetail
+from config.settings import settings
+from utils.ollama_client import EXTRACTION_PROMPT_VERSION
+from utils.pipeline_cache import PipelineCache, make_key
+
+
+# Enhanced schema for Qwen2.5; built once and shared by every extraction
+INVOICE_EXTRACTION_SCHEMA = {
+    "type": "object",
+    "required": ["invoice_number", "date", "vendor_name", "total_amount"],
+    "properties": {
+        "invoice_number": {
+            "type": "string",
+            "description": "Invoice number or reference ID"
+        },
+        "date": {
+            "type": "string", 
+            "format": "date",
+            "description": "Invoice date in YYYY-MM-DD format"
+        },
+        "due_date": {
+            "type": "string", 
+            "format": "date",
+            "description": "Payment due date in YYYY-MM-DD format"
+        },
+        "vendor_name": {
+            "type": "string",
+            "description": "Supplier/vendor company name"
+        },
+        "vendor_address": {
+            "type": "string",
+            "description": "Complete vendor address"
+        },
+        "vendor_tax_id": {
+            "type": "string",
+            "description": "Vendor tax ID, VAT number, or EIN"
+        },
+        "buyer_name": {
+            "type": "string",
+            "description": "Customer/buyer company name"
+        },
+        "buyer_address": {
+            "type": "string",
+            "description": "Complete buyer address"
+        },
+        "line_items": {
+            "type": "array",
+            "description": "List of invoice line items",
+            "items": {
+                "type": "object",
+                "required": ["description", "quantity", "unit_price", "total"],
+                "properties": {
+                    "description": {"type": "string"},
+                    "quantity": {"type": "number"},
+                    "unit_price": {"type": "number"},
+                    "total": {"type": "number"}
+                }
+            }
+        },
+        "currency": {"type": "string"},
+        "subtotal": {"type": "number"},
+        "tax_amount": {"type": "number"},
+        "total_amount": {"type": "number"},
+        "region": {"type": "string"}
+    }
+}
 
 
 class DataExtractionAgent(BaseAgent):
@@ -22,6 +87,9 @@ class DataExtractionAgent(BaseAgent):
             "%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%d-%m-%Y", "%B %d, %Y", "%b %d, %Y"
         ]
         
+        # Re-submitted invoices reuse their LLM extraction instead of calling Ollama again
+        self.extraction_cache = PipelineCache() if settings.PIPELINE_CACHE_ENABLED else None
+        
         self.logger.info("Data extraction agent initialized")
     
     def validate_input(self, input_data: Any) -> bool:
@@ -67,7 +135,7 @@ class DataExtractionAgent(BaseAgent):
             cleaned_text = self._preprocess_text(raw_text)
             
             # Extract structured data using LLM
-            extracted_data = self._extract_with_llm(cleaned_text)
+            extracted_data = self._extract_with_llm(cleaned_text, context)
             
             # Post-process and validate extracted data
             processed_data = self._post_process_extraction(extracted_data, cleaned_text)
@@ -114,77 +182,37 @@ class DataExtractionAgent(BaseAgent):
         
         return text.strip()
     
-    def _extract_with_llm(self, text: str) -> Dict[str, Any]:
+    def _extract_with_llm(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Use Qwen2.5:14b LLM to extract structured data from text with enhanced validation"""
         
-        # Enhanced schema for Qwen2.5
-        schema = {
-            "type": "object",
-            "required": ["invoice_number", "date", "vendor_name", "total_amount"],
-            "properties": {
-                "invoice_number": {
-                    "type": "string",
-                    "description": "Invoice number or reference ID"
-                },
-                "date": {
-                    "type": "string", 
-                    "format": "date",
-                    "description": "Invoice date in YYYY-MM-DD format"
-                },
-                "due_date": {
-                    "type": "string", 
-                    "format": "date",
-                    "description": "Payment due date in YYYY-MM-DD format"
-                },
-                "vendor_name": {
-                    "type": "string",
-                    "description": "Supplier/vendor company name"
-                },
-                "vendor_address": {
-                    "type": "string",
-                    "description": "Complete vendor address"
-                },
-                "vendor_tax_id": {
-                    "type": "string",
-                    "description": "Vendor tax ID, VAT number, or EIN"
-                },
-                "buyer_name": {
-                    "type": "string",
-                    "description": "Customer/buyer company name"
-                },
-                "buyer_address": {
-                    "type": "string",
-                    "description": "Complete buyer address"
-                },
-                "line_items": {
-                    "type": "array",
-                    "description": "List of invoice line items",
-                    "items": {
-                        "type": "object",
-                        "required": ["description", "quantity", "unit_price", "total"],
-                        "properties": {
-                            "description": {"type": "string"},
-                            "quantity": {"type": "number"},
-                            "unit_price": {"type": "number"},
-                            "total": {"type": "number"}
-                        }
-                    }
-                },
-                "currency": {"type": "string"},
-                "subtotal": {"type": "number"},
-                "tax_amount": {"type": "number"},
-                "total_amount": {"type": "number"},
-                "region": {"type": "string"}
-            }
-        }
+        schema = INVOICE_EXTRACTION_SCHEMA
+        
+        cache_key = None
+        if self.extraction_cache is not None:
+            cache_key = make_key(
+                self.ollama_client.model, EXTRACTION_PROMPT_VERSION,
+                str(settings.EXTRACTION_TEXT_LIMIT), str(settings.VALIDATION_TEXT_LIMIT), text
+            )
+            cached = self.extraction_cache.get(cache_key)
+            if cached:
+                self.logger.info("Reusing cached LLM extraction")
+                # Lets the audit record show the extraction was replayed, and from which entry
+                if context is not None:
+                    context["extraction_cache_key"] = cache_key
+                return cached
+        
+        if len(text) > settings.EXTRACTION_TEXT_LIMIT:
+            self.logger.info(
+                f"Truncating invoice text from {len(text)} to {settings.EXTRACTION_TEXT_LIMIT} characters for the LLM"
+            )
         
         try:
             # Use enhanced Qwen2.5 extraction with schema
-            extracted_data = self.ollama_client.extract_structured_data(text[:3000], schema)
+            extracted_data = self.ollama_client.extract_structured_data(text[:settings.EXTRACTION_TEXT_LIMIT], schema)
             
             # Validate extraction using Qwen2.5 validation
             if extracted_data:
-                validation_result = self.ollama_client.validate_invoice_data(text[:2000], extracted_data)
+                validation_result = self.ollama_client.validate_invoice_data(text[:settings.VALIDATION_TEXT_LIMIT], extracted_data)
                 
                 # Apply corrections if suggested
                 if validation_result.get("corrections"):
@@ -199,6 +227,9 @@ class DataExtractionAgent(BaseAgent):
                     "errors": validation_result.get("errors", []),
                     "warnings": validation_result.get("warnings", [])
                 }
+                
+                if cache_key is not None:
+                    self.extraction_cache.set(cache_key, extracted_data)
             
             return extracted_data
             
@@ -1,14 +1,15 @@
 """
 Regional Compliance Agent - Applies region-specific rules and regulations
 """
-import re
+import bisect
+import math
 from typing import Any, Dict, List, Optional
 
 from agents.base_agent import BaseAgent
 from models.processing_result import ProcessingResult
 from models.invoice_model import Invoice, ProcessingStatus
 from config.regional_rules import (
-    get_regional_rules, get_validation_rules, validate_region,
+    Region, get_regional_rules, get_validation_rules, validate_region,
     get_supported_currencies, get_tax_types, get_approval_limits
 )
 
@@ -16,11 +17,23 @@ from config.regional_rules import (
 class RegionalComplianceAgent(BaseAgent):
     """Agent responsible for applying region-specific compliance rules"""
     
+    __slots__ = ("validation_rules", "_approval_tiers", "_approval_amounts")
+    
     def __init__(self, ollama_client=None):
         super().__init__("regional_compliance", ollama_client)
         
         self.validation_rules = get_validation_rules()
         
+        # Approval tiers sorted by upper limit, searched with bisect per invoice
+        self._approval_tiers: Dict[str, List[tuple]] = {}
+        self._approval_amounts: Dict[str, List[float]] = {}
+        for region in Region:
+            approval_limits = get_approval_limits(region.value)
+            if approval_limits:
+                tiers = self._build_approval_tiers(approval_limits)
+                self._approval_tiers[region.value] = tiers
+                self._approval_amounts[region.value] = [tier[0] for tier in tiers]
+        
         self.logger.info("Regional compliance agent initialized")
     
     def validate_input(self, input_data: Any) -> bool:
@@ -119,6 +132,7 @@ class RegionalComplianceAgent(BaseAgent):
     
     def _check_compliance(self, invoice: Invoice, region: str, regional_rules: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Perform comprehensive compliance checks"""
+        # Pass results carry an empty message - only errors and warnings are ever surfaced
         compliance_results = []
         
         # Check currency compliance
@@ -158,7 +172,7 @@ class RegionalComplianceAgent(BaseAgent):
             results.append({
                 "check": "currency_compliance",
                 "status": "pass",
-                "message": f"Currency '{invoice.currency}' is supported in region {region}",
+                "message": "",
                 "severity": "low"
             })
         
@@ -172,33 +186,34 @@ class RegionalComplianceAgent(BaseAgent):
         expected_tax_types = regional_rules.get("tax_types", [])
         
         # Check if tax amount is reasonable
-        if invoice.subtotal and invoice.total_tax is not None:
-            if invoice.subtotal > 0:
-                actual_tax_rate = invoice.total_tax / invoice.subtotal
-                standard_rate = tax_rates.get("standard", 0.08)
-                max_rate = standard_rate * 1.5  # Allow some flexibility
-                
-                if actual_tax_rate > max_rate:
-                    results.append({
-                        "check": "tax_compliance",
-                        "status": "warning",
-                        "message": f"Tax rate ({actual_tax_rate:.2%}) seems high for region {region} (standard: {standard_rate:.2%})",
-                        "severity": "medium"
-                    })
-                elif actual_tax_rate < 0:
-                    results.append({
-                        "check": "tax_compliance",
-                        "status": "error",
-                        "message": "Tax amount cannot be negative",
-                        "severity": "high"
-                    })
-                else:
-                    results.append({
-                        "check": "tax_compliance",
-                        "status": "pass",
-                        "message": f"Tax rate ({actual_tax_rate:.2%}) is within acceptable range for region {region}",
-                        "severity": "low"
-                    })
+        if invoice.subtotal and invoice.subtotal > 0 and invoice.total_tax is not None:
+            subtotal = invoice.subtotal
+            tax = invoice.total_tax
+            standard_rate = tax_rates.get("standard", 0.08)
+            max_rate = standard_rate * 1.5  # Allow some flexibility
+
+            # Compare cross-multiplied so the rate is only computed when reported
+            if tax > max_rate * subtotal:
+                results.append({
+                    "check": "tax_compliance",
+                    "status": "warning",
+                    "message": f"Tax rate ({tax / subtotal:.2%}) seems high for region {region} (standard: {standard_rate:.2%})",
+                    "severity": "medium"
+                })
+            elif tax < 0:
+                results.append({
+                    "check": "tax_compliance",
+                    "status": "error",
+                    "message": "Tax amount cannot be negative",
+                    "severity": "high"
+                })
+            else:
+                results.append({
+                    "check": "tax_compliance",
+                    "status": "pass",
+                    "message": "",
+                    "severity": "low"
+                })
         
         return results
     
@@ -229,9 +244,12 @@ class RegionalComplianceAgent(BaseAgent):
             "total_amount": invoice.total_amount
         }
         
+        # One set difference finds every missing field; results keep the rule order
+        present_fields = {field for field, value in field_mapping.items() if value}
+        missing_fields = regional_rules.get("required_fields_set", frozenset(required_fields)) - present_fields
+        
         for field in required_fields:
-            value = field_mapping.get(field)
-            if not value:
+            if field in missing_fields:
                 results.append({
                     "check": "required_fields",
                     "status": "error",
@@ -242,7 +260,7 @@ class RegionalComplianceAgent(BaseAgent):
                 results.append({
                     "check": "required_fields",
                     "status": "pass",
-                    "message": f"Regional required field '{field}' is present",
+                    "message": "",
                     "severity": "low"
                 })
         
@@ -256,8 +274,8 @@ class RegionalComplianceAgent(BaseAgent):
         
         # Check vendor tax ID format if required
         if vendor_validation.get("require_tax_id") and invoice.vendor_tax_id:
-            tax_id_pattern = vendor_validation.get("tax_id_format")
-            if tax_id_pattern and not re.match(tax_id_pattern, invoice.vendor_tax_id):
+            tax_id_pattern = vendor_validation.get("tax_id_format_re")
+            if tax_id_pattern and not tax_id_pattern.match(invoice.vendor_tax_id):
                 results.append({
                     "check": "entity_requirements",
                     "status": "error",
@@ -268,14 +286,14 @@ class RegionalComplianceAgent(BaseAgent):
                 results.append({
                     "check": "entity_requirements",
                     "status": "pass",
-                    "message": f"Vendor tax ID format valid for region {region}",
+                    "message": "",
                     "severity": "low"
                 })
         
         # Check VAT number format for EU
         if vendor_validation.get("require_vat_number") and invoice.vendor_tax_id:
-            vat_pattern = vendor_validation.get("vat_number_format")
-            if vat_pattern and not re.match(vat_pattern, invoice.vendor_tax_id):
+            vat_pattern = vendor_validation.get("vat_number_format_re")
+            if vat_pattern and not vat_pattern.match(invoice.vendor_tax_id):
                 results.append({
                     "check": "entity_requirements",
                     "status": "error",
@@ -286,14 +304,14 @@ class RegionalComplianceAgent(BaseAgent):
                 results.append({
                     "check": "entity_requirements",
                     "status": "pass",
-                    "message": f"Vendor VAT number format valid for region {region}",
+                    "message": "",
                     "severity": "low"
                 })
         
         # Check GSTIN format for APAC
         if vendor_validation.get("require_gstin") and invoice.vendor_tax_id:
-            gstin_pattern = vendor_validation.get("gstin_format")
-            if gstin_pattern and not re.match(gstin_pattern, invoice.vendor_tax_id):
+            gstin_pattern = vendor_validation.get("gstin_format_re")
+            if gstin_pattern and not gstin_pattern.match(invoice.vendor_tax_id):
                 results.append({
                     "check": "entity_requirements",
                     "status": "error",
@@ -304,7 +322,7 @@ class RegionalComplianceAgent(BaseAgent):
                 results.append({
                     "check": "entity_requirements",
                     "status": "pass",
-                    "message": f"Vendor GSTIN format valid for region {region}",
+                    "message": "",
                     "severity": "low"
                 })
         
@@ -338,7 +356,7 @@ class RegionalComplianceAgent(BaseAgent):
                 results.append({
                     "check": "amount_limits",
                     "status": "pass",
-                    "message": f"Total amount ({invoice.total_amount}) within regional limits",
+                    "message": "",
                     "severity": "low"
                 })
         
@@ -360,10 +378,21 @@ class RegionalComplianceAgent(BaseAgent):
         
         return results
     
+    def _build_approval_tiers(self, approval_limits: Dict[str, float]) -> List[tuple]:
+        """Build (upper_limit, approver, level, reason) tiers from regional approval limits"""
+        auto_limit = approval_limits.get("auto_approve_limit", 0)
+        manager_limit = approval_limits.get("manager_approval_limit", 10000)
+        executive_limit = approval_limits.get("executive_approval_limit", 50000)
+        
+        return [
+            (auto_limit, "system", "auto", "Within auto-approval limits"),
+            (manager_limit, "manager", "manager", f"Amount exceeds auto-approval limit ({auto_limit})"),
+            (executive_limit, "executive", "executive", f"Amount exceeds manager approval limit ({manager_limit})"),
+            (math.inf, "board", "board", f"Amount exceeds executive approval limit ({executive_limit})")
+        ]
+    
     def _determine_approval_requirements(self, invoice: Invoice, region: str) -> Dict[str, Any]:
         """Determine approval requirements based on regional rules and amount"""
-        approval_limits = get_approval_limits(region)
-        
         approval_info = {
             "region": region,
             "amount": invoice.total_amount,
@@ -372,37 +401,25 @@ class RegionalComplianceAgent(BaseAgent):
             "reason": "Within auto-approval limits"
         }
         
-        if not approval_limits:
+        tiers = self._approval_tiers.get(region)
+        if not tiers:
             approval_info["required_approver"] = "manager"
             approval_info["approval_level"] = "manual"
             approval_info["reason"] = "No approval limits defined for region"
             return approval_info
         
-        auto_limit = approval_limits.get("auto_approve_limit", 0)
-        manager_limit = approval_limits.get("manager_approval_limit", 10000)
-        executive_limit = approval_limits.get("executive_approval_limit", 50000)
-        
         if not invoice.total_amount:
             approval_info["required_approver"] = "manager"
             approval_info["approval_level"] = "manual"
             approval_info["reason"] = "Total amount is missing or zero"
             return approval_info
         
-        if invoice.total_amount <= auto_limit:
-            approval_info["required_approver"] = "system"
-            approval_info["approval_level"] = "auto"
-        elif invoice.total_amount <= manager_limit:
-            approval_info["required_approver"] = "manager"
-            approval_info["approval_level"] = "manager"
-            approval_info["reason"] = f"Amount exceeds auto-approval limit ({auto_limit})"
-        elif invoice.total_amount <= executive_limit:
-            approval_info["required_approver"] = "executive"
-            approval_info["approval_level"] = "executive"
-            approval_info["reason"] = f"Amount exceeds manager approval limit ({manager_limit})"
-        else:
-            approval_info["required_approver"] = "board"
-            approval_info["approval_level"] = "board"
-            approval_info["reason"] = f"Amount exceeds executive approval limit ({executive_limit})"
+        # Limits are inclusive upper bounds, so bisect_left picks the first tier that covers the amount
+        index = bisect.bisect_left(self._approval_amounts[region], invoice.total_amount)
+        _, approver, level, reason = tiers[index]
+        approval_info["required_approver"] = approver
+        approval_info["approval_level"] = level
+        approval_info["reason"] = reason
         
         return approval_info
     
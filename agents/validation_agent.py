@@ -2,12 +2,41 @@
 Validation Agent - Validates extracted invoice data for accuracy and completeness
 """
 import re
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
+from agents._validation_kernels import line_item_mismatches
 from agents.base_agent import BaseAgent
 from models.processing_result import ProcessingResult
-from models.invoice_model import Invoice, ProcessingStatus
+from models.invoice_model import Invoice, LineItemBatch, ProcessingStatus
+
+# Deletes every allowed invoice-number character; anything left over is unusual
+_INVOICE_NUM_STRIP = str.maketrans('', '', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_#')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Score weight of a check by severity, and the share of it a warning still earns
+SEVERITY_WEIGHTS = {"low": 1.0, "medium": 2.0, "high": 3.0}
+WARNING_CREDIT = 0.7
+
+
+@dataclass(slots=True)
+class ValidationCheck:
+    """Outcome of a single validation check"""
+    check: str
+    field: str
+    status: str
+    message: str
+    severity: str
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access, so downstream agents can read checks like compliance results"""
+        return getattr(self, key, default)
 
 
 class ValidationAgent(BaseAgent):
@@ -17,10 +46,17 @@ class ValidationAgent(BaseAgent):
         super().__init__("validation", ollama_client)
         
         # Validation settings
-        self.required_fields = ["invoice_number", "vendor_name", "buyer_name", "total_amount", "currency"]
         self.date_tolerance_days = 365  # Allow dates within 1 year
         self.amount_precision = 2
-        self.supported_currencies = ["USD", "EUR", "GBP", "CAD", "AUD", "JPY"]
+        self.supported_currencies = frozenset(("USD", "EUR", "GBP", "CAD", "AUD", "JPY"))
+        
+        # Results of recent validations, keyed by the invoice content they depend on
+        self.validation_cache_size = 1024
+        self._validation_cache: "OrderedDict[tuple, Tuple[List[ValidationCheck], int]]" = OrderedDict()
+        self._validation_cache_lock = threading.Lock()
+        
+        # Worker threads used by process_batch
+        self.batch_workers = 5
         
         self.logger.info("Validation agent initialized")
     
@@ -67,11 +103,11 @@ class ValidationAgent(BaseAgent):
                 result=f"Validating invoice {getattr(invoice, 'invoice_number', 'Unknown')}"
             )
             
-            # Perform validation checks
-            validation_results = self._validate_invoice(invoice)
+            # Perform validation checks - only failures are recorded, passes are counted
+            validation_results, passed_checks = self._validate_invoice(invoice)
             
             # Calculate overall validation score
-            validation_score = self._calculate_validation_score(validation_results)
+            validation_score = self._calculate_validation_score(validation_results, passed_checks)
             result.confidence_score = validation_score
             
             # Determine processing status based on validation
@@ -95,14 +131,19 @@ class ValidationAgent(BaseAgent):
             # Store validation results
             if context is not None:
                 context["validation_results"] = validation_results
+                context["validation_score"] = validation_score
+                context["validation_check_count"] = len(validation_results) + passed_checks
                 context["invoice"] = invoice
             
             # Add any validation errors
-            for check_result in validation_results:
-                if check_result["status"] == "error":
-                    result.add_error(f"Validation error: {check_result['message']}")
-                elif check_result["status"] == "warning":
-                    result.add_warning(f"Validation warning: {check_result['message']}")
+            result.extend_errors([
+                f"Validation error: {check_result.message}"
+                for check_result in validation_results if check_result.status == "error"
+            ])
+            result.extend_warnings([
+                f"Validation warning: {check_result.message}"
+                for check_result in validation_results if check_result.status == "warning"
+            ])
             
         except Exception as e:
             error_msg = f"Validation failed: {str(e)}"
@@ -111,163 +152,186 @@ class ValidationAgent(BaseAgent):
         
         return result
     
-    def _validate_invoice(self, invoice: Invoice) -> List[Dict[str, Any]]:
-        """Perform comprehensive validation of the invoice"""
-        validation_results = []
-        
-        # Check required fields
-        validation_results.extend(self._validate_required_fields(invoice))
-        
-        # Validate data formats
-        validation_results.extend(self._validate_data_formats(invoice))
-        
-        # Validate business logic
-        validation_results.extend(self._validate_business_logic(invoice))
+    def process_batch(self, invoices: List[Invoice]) -> List[ProcessingResult]:
+        """Validate a batch of invoices in parallel, returning results in input order"""
+        if not invoices:
+            return []
         
-        # Validate mathematical calculations
-        validation_results.extend(self._validate_calculations(invoice))
+        with ThreadPoolExecutor(max_workers=min(self.batch_workers, len(invoices))) as executor:
+            return list(executor.map(self.process, invoices))
+    
+    def _validate_invoice(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
+        """
+        Perform comprehensive validation of the invoice
         
-        # Validate line items
-        validation_results.extend(self._validate_line_items(invoice))
+        Returns:
+            Tuple of the failed (error/warning) checks and the number of passed checks
+        """
+        cache_key = self._validation_cache_key(invoice)
+        with self._validation_cache_lock:
+            cached = self._validation_cache.get(cache_key)
+            if cached is not None:
+                self._validation_cache.move_to_end(cache_key)
+        if cached is not None:
+            return list(cached[0]), cached[1]
         
-        return validation_results
+        validation_results = []
+        passed_checks = 0
+        
+        validators = (
+            self._validate_required_fields,
+            self._validate_data_formats,
+            self._validate_business_logic,
+            self._validate_calculations,
+            self._validate_line_items
+        )
+        
+        for validator in validators:
+            failures, passed = validator(invoice)
+            validation_results.extend(failures)
+            passed_checks += passed
+        
+        with self._validation_cache_lock:
+            self._validation_cache[cache_key] = (list(validation_results), passed_checks)
+            if len(self._validation_cache) > self.validation_cache_size:
+                self._validation_cache.popitem(last=False)
+        
+        return validation_results, passed_checks
     
-    def _validate_required_fields(self, invoice: Invoice) -> List[Dict[str, Any]]:
+    def _validation_cache_key(self, invoice: Invoice) -> tuple:
+        """Build a cache key from every invoice field the validators read"""
+        line_items = tuple(
+            (item.quantity, item.unit_price, item.total, item.description)
+            for item in invoice.line_items or ()
+        )
+        
+        # Date checks are relative to today, so entries expire with the day
+        return (
+            date.today(), invoice.invoice_number, invoice.vendor_name, invoice.buyer_name,
+            invoice.vendor_email, invoice.buyer_email, invoice.currency,
+            invoice.date, invoice.due_date, invoice.subtotal, invoice.total_tax,
+            invoice.discount_amount, invoice.total_amount, line_items
+        )
+    
+    def _validate_required_fields(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
         """Validate that all required fields are present"""
         results = []
+        passed = 0
+        
+        required_fields = (
+            ("invoice_number", invoice.invoice_number),
+            ("vendor_name", invoice.vendor_name),
+            ("buyer_name", invoice.buyer_name),
+            ("total_amount", invoice.total_amount),
+            ("currency", invoice.currency)
+        )
         
-        for field in self.required_fields:
-            value = getattr(invoice, field, None)
+        for field, value in required_fields:
             if not value:
-                results.append({
-                    "check": "required_fields",
-                    "field": field,
-                    "status": "error",
-                    "message": f"Required field '{field}' is missing or empty",
-                    "severity": "high"
-                })
+                results.append(ValidationCheck(
+                    check="required_fields",
+                    field=field,
+                    status="error",
+                    message=f"Required field '{field}' is missing or empty",
+                    severity="high"
+                ))
             else:
-                results.append({
-                    "check": "required_fields",
-                    "field": field,
-                    "status": "pass",
-                    "message": f"Required field '{field}' is present",
-                    "severity": "low"
-                })
-        
-        return results
+                passed += 1
+        
+        return results, passed
     
-    def _validate_data_formats(self, invoice: Invoice) -> List[Dict[str, Any]]:
+    def _validate_data_formats(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
         """Validate data formats and types"""
         results = []
+        passed = 0
+        
+        # Date bounds are shared by the invoice and due date checks
+        date_bounds = self._get_date_bounds()
         
         # Validate invoice number format
         if invoice.invoice_number:
-            if not re.match(r'^[A-Z0-9\-_#]+$', invoice.invoice_number):
-                results.append({
-                    "check": "data_formats",
-                    "field": "invoice_number",
-                    "status": "warning",
-                    "message": "Invoice number contains unusual characters",
-                    "severity": "low"
-                })
+            if invoice.invoice_number.translate(_INVOICE_NUM_STRIP):
+                results.append(ValidationCheck(
+                    check="data_formats",
+                    field="invoice_number",
+                    status="warning",
+                    message="Invoice number contains unusual characters",
+                    severity="low"
+                ))
             else:
-                results.append({
-                    "check": "data_formats",
-                    "field": "invoice_number",
-                    "status": "pass",
-                    "message": "Invoice number format is valid",
-                    "severity": "low"
-                })
+                passed += 1
         
         # Validate dates
         if invoice.date:
-            if not self._is_reasonable_date(invoice.date):
-                results.append({
-                    "check": "data_formats",
-                    "field": "date",
-                    "status": "error",
-                    "message": "Invoice date is unreasonable or outside acceptable range",
-                    "severity": "high"
-                })
+            if not self._is_reasonable_date(invoice.date, date_bounds):
+                results.append(ValidationCheck(
+                    check="data_formats",
+                    field="date",
+                    status="error",
+                    message="Invoice date is unreasonable or outside acceptable range",
+                    severity="high"
+                ))
             else:
-                results.append({
-                    "check": "data_formats",
-                    "field": "date",
-                    "status": "pass",
-                    "message": "Invoice date is valid",
-                    "severity": "low"
-                })
+                passed += 1
         
         if invoice.due_date:
-            if not self._is_reasonable_date(invoice.due_date):
-                results.append({
-                    "check": "data_formats",
-                    "field": "due_date",
-                    "status": "error",
-                    "message": "Due date is unreasonable or outside acceptable range",
-                    "severity": "high"
-                })
+            if not self._is_reasonable_date(invoice.due_date, date_bounds):
+                results.append(ValidationCheck(
+                    check="data_formats",
+                    field="due_date",
+                    status="error",
+                    message="Due date is unreasonable or outside acceptable range",
+                    severity="high"
+                ))
             elif invoice.date and invoice.due_date < invoice.date:
-                results.append({
-                    "check": "data_formats",
-                    "field": "due_date",
-                    "status": "error",
-                    "message": "Due date cannot be before invoice date",
-                    "severity": "high"
-                })
+                results.append(ValidationCheck(
+                    check="data_formats",
+                    field="due_date",
+                    status="error",
+                    message="Due date cannot be before invoice date",
+                    severity="high"
+                ))
             else:
-                results.append({
-                    "check": "data_formats",
-                    "field": "due_date",
-                    "status": "pass",
-                    "message": "Due date is valid",
-                    "severity": "low"
-                })
+                passed += 1
         
         # Validate currency
         if invoice.currency:
             if invoice.currency not in self.supported_currencies:
-                results.append({
-                    "check": "data_formats",
-                    "field": "currency",
-                    "status": "warning",
-                    "message": f"Currency '{invoice.currency}' is not in supported list",
-                    "severity": "medium"
-                })
+                results.append(ValidationCheck(
+                    check="data_formats",
+                    field="currency",
+                    status="warning",
+                    message=f"Currency '{invoice.currency}' is not in supported list",
+                    severity="medium"
+                ))
             else:
-                results.append({
-                    "check": "data_formats",
-                    "field": "currency",
-                    "status": "pass",
-                    "message": "Currency is supported",
-                    "severity": "low"
-                })
+                passed += 1
         
         # Validate email formats
         if invoice.vendor_email and not self._is_valid_email(invoice.vendor_email):
-            results.append({
-                "check": "data_formats",
-                "field": "vendor_email",
-                "status": "warning",
-                "message": "Vendor email format appears invalid",
-                "severity": "medium"
-            })
+            results.append(ValidationCheck(
+                check="data_formats",
+                field="vendor_email",
+                status="warning",
+                message="Vendor email format appears invalid",
+                severity="medium"
+            ))
         
         if invoice.buyer_email and not self._is_valid_email(invoice.buyer_email):
-            results.append({
-                "check": "data_formats",
-                "field": "buyer_email",
-                "status": "warning",
-                "message": "Buyer email format appears invalid",
-                "severity": "medium"
-            })
-        
-        return results
+            results.append(ValidationCheck(
+                check="data_formats",
+                field="buyer_email",
+                status="warning",
+                message="Buyer email format appears invalid",
+                severity="medium"
+            ))
+        
+        return results, passed
     
-    def _validate_business_logic(self, invoice: Invoice) -> List[Dict[str, Any]]:
+    def _validate_business_logic(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
         """Validate business logic rules"""
         results = []
+        passed = 0
         
         # Check for duplicate invoice numbers (would need external data source)
         # For now, just validate format uniqueness characteristics
@@ -275,54 +339,43 @@ class ValidationAgent(BaseAgent):
         # Validate vendor and buyer are different
         if invoice.vendor_name and invoice.buyer_name:
             if invoice.vendor_name.lower() == invoice.buyer_name.lower():
-                results.append({
-                    "check": "business_logic",
-                    "field": "vendor_buyer",
-                    "status": "warning",
-                    "message": "Vendor and buyer appear to be the same entity",
-                    "severity": "medium"
-                })
+                results.append(ValidationCheck(
+                    check="business_logic",
+                    field="vendor_buyer",
+                    status="warning",
+                    message="Vendor and buyer appear to be the same entity",
+                    severity="medium"
+                ))
             else:
-                results.append({
-                    "check": "business_logic",
-                    "field": "vendor_buyer",
-                    "status": "pass",
-                    "message": "Vendor and buyer are different entities",
-                    "severity": "low"
-                })
+                passed += 1
         
         # Validate reasonable amounts
         if invoice.total_amount:
             if invoice.total_amount <= 0:
-                results.append({
-                    "check": "business_logic",
-                    "field": "total_amount",
-                    "status": "error",
-                    "message": "Total amount must be positive",
-                    "severity": "high"
-                })
+                results.append(ValidationCheck(
+                    check="business_logic",
+                    field="total_amount",
+                    status="error",
+                    message="Total amount must be positive",
+                    severity="high"
+                ))
             elif invoice.total_amount > 1000000:  # $1M limit
-                results.append({
-                    "check": "business_logic",
-                    "field": "total_amount",
-                    "status": "warning",
-                    "message": "Total amount is very high - please verify",
-                    "severity": "medium"
-                })
+                results.append(ValidationCheck(
+                    check="business_logic",
+                    field="total_amount",
+                    status="warning",
+                    message="Total amount is very high - please verify",
+                    severity="medium"
+                ))
             else:
-                results.append({
-                    "check": "business_logic",
-                    "field": "total_amount",
-                    "status": "pass",
-                    "message": "Total amount is reasonable",
-                    "severity": "low"
-                })
-        
-        return results
+                passed += 1
+        
+        return results, passed
     
-    def _validate_calculations(self, invoice: Invoice) -> List[Dict[str, Any]]:
+    def _validate_calculations(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
         """Validate mathematical calculations"""
         results = []
+        passed = 0
         
         # Validate line items sum to subtotal
         if invoice.line_items and invoice.subtotal:
@@ -330,21 +383,15 @@ class ValidationAgent(BaseAgent):
             diff = abs(calculated_subtotal - invoice.subtotal)
             
             if diff > 0.01:  # Allow for small rounding differences
-                results.append({
-                    "check": "calculations",
-                    "field": "subtotal",
-                    "status": "error",
-                    "message": f"Line items total ({calculated_subtotal}) doesn't match subtotal ({invoice.subtotal})",
-                    "severity": "high"
-                })
+                results.append(ValidationCheck(
+                    check="calculations",
+                    field="subtotal",
+                    status="error",
+                    message=f"Line items total ({calculated_subtotal}) doesn't match subtotal ({invoice.subtotal})",
+                    severity="high"
+                ))
             else:
-                results.append({
-                    "check": "calculations",
-                    "field": "subtotal",
-                    "status": "pass",
-                    "message": "Line items sum matches subtotal",
-                    "severity": "low"
-                })
+                passed += 1
         
         # Validate total calculation
         if invoice.subtotal and invoice.total_tax is not None and invoice.total_amount:
@@ -354,127 +401,141 @@ class ValidationAgent(BaseAgent):
             diff = abs(calculated_total - invoice.total_amount)
             
             if diff > 0.01:
-                results.append({
-                    "check": "calculations",
-                    "field": "total_amount",
-                    "status": "error",
-                    "message": f"Calculated total ({calculated_total}) doesn't match stated total ({invoice.total_amount})",
-                    "severity": "high"
-                })
+                results.append(ValidationCheck(
+                    check="calculations",
+                    field="total_amount",
+                    status="error",
+                    message=f"Calculated total ({calculated_total}) doesn't match stated total ({invoice.total_amount})",
+                    severity="high"
+                ))
             else:
-                results.append({
-                    "check": "calculations",
-                    "field": "total_amount",
-                    "status": "pass",
-                    "message": "Total amount calculation is correct",
-                    "severity": "low"
-                })
-        
-        return results
+                passed += 1
+        
+        return results, passed
     
-    def _validate_line_items(self, invoice: Invoice) -> List[Dict[str, Any]]:
+    def _validate_line_items(self, invoice: Invoice) -> Tuple[List[ValidationCheck], int]:
         """Validate individual line items"""
         results = []
+        passed = 0
         
         if not invoice.line_items:
-            results.append({
-                "check": "line_items",
-                "field": "line_items",
-                "status": "warning",
-                "message": "No line items found",
-                "severity": "medium"
-            })
-            return results
-        
-        for i, item in enumerate(invoice.line_items):
+            results.append(ValidationCheck(
+                check="line_items",
+                field="line_items",
+                status="warning",
+                message="No line items found",
+                severity="medium"
+            ))
+            return results, passed
+        
+        items = invoice.line_items
+        count = len(items)
+        
+        # Numeric columns; missing values are NaN so they never compare true
+        batch = invoice.line_items_batch
+        if batch is None:
+            batch = LineItemBatch.from_line_items(items)
+        qty, price, total = batch.quantity, batch.unit_price, batch.total
+        
+        # Only None counts as missing; a NaN value fails no check, as in the per-item loop
+        missing = np.fromiter((item.quantity is None or item.unit_price is None or item.total is None
+                               for item in items), dtype=np.bool_, count=count)
+        mismatch = line_item_mismatches(qty, price, total)
+        bad_qty = qty <= 0
+        bad_price = price < 0
+        short_desc = np.fromiter((not item.description or len(item.description.strip()) < 3 for item in items),
+                                 dtype=np.bool_, count=count)
+        
+        # Only items that failed at least one check need a Python-level visit
+        for i in np.flatnonzero(missing | mismatch | bad_qty | bad_price | short_desc).tolist():
+            item = items[i]
+            
             # Validate line item calculations - check for None values
-            if item.quantity is None or item.unit_price is None or item.total is None:
-                results.append({
-                    "check": "line_items",
-                    "field": f"line_item_{i}",
-                    "status": "error",
-                    "message": f"Line item {i+1}: has missing quantity, price, or total",
-                    "severity": "high"
-                })
+            if missing[i]:
+                results.append(ValidationCheck(
+                    check="line_items",
+                    field=f"line_item_{i}",
+                    status="error",
+                    message=f"Line item {i+1}: has missing quantity, price, or total",
+                    severity="high"
+                ))
                 continue
-                
-            calculated_total = item.quantity * item.unit_price
-            diff = abs(calculated_total - item.total)
             
-            if diff > 0.01:
-                results.append({
-                    "check": "line_items",
-                    "field": f"line_item_{i}",
-                    "status": "error",
-                    "message": f"Line item {i+1}: calculated total ({calculated_total}) doesn't match stated total ({item.total})",
-                    "severity": "high"
-                })
+            if mismatch[i]:
+                calculated_total = item.quantity * item.unit_price
+                results.append(ValidationCheck(
+                    check="line_items",
+                    field=f"line_item_{i}",
+                    status="error",
+                    message=f"Line item {i+1}: calculated total ({calculated_total}) doesn't match stated total ({item.total})",
+                    severity="high"
+                ))
             
             # Validate positive values
-            if item.quantity <= 0:
-                results.append({
-                    "check": "line_items",
-                    "field": f"line_item_{i}",
-                    "status": "error",
-                    "message": f"Line item {i+1}: quantity must be positive",
-                    "severity": "high"
-                })
+            if bad_qty[i]:
+                results.append(ValidationCheck(
+                    check="line_items",
+                    field=f"line_item_{i}",
+                    status="error",
+                    message=f"Line item {i+1}: quantity must be positive",
+                    severity="high"
+                ))
             
-            if item.unit_price < 0:
-                results.append({
-                    "check": "line_items",
-                    "field": f"line_item_{i}",
-                    "status": "error",
-                    "message": f"Line item {i+1}: unit price cannot be negative",
-                    "severity": "high"
-                })
+            if bad_price[i]:
+                results.append(ValidationCheck(
+                    check="line_items",
+                    field=f"line_item_{i}",
+                    status="error",
+                    message=f"Line item {i+1}: unit price cannot be negative",
+                    severity="high"
+                ))
             
             # Validate description
-            if not item.description or len(item.description.strip()) < 3:
-                results.append({
-                    "check": "line_items",
-                    "field": f"line_item_{i}",
-                    "status": "warning",
-                    "message": f"Line item {i+1}: description is too short or missing",
-                    "severity": "medium"
-                })
-        
-        return results
+            if short_desc[i]:
+                results.append(ValidationCheck(
+                    check="line_items",
+                    field=f"line_item_{i}",
+                    status="warning",
+                    message=f"Line item {i+1}: description is too short or missing",
+                    severity="medium"
+                ))
+        
+        return results, passed
     
-    def _is_reasonable_date(self, date: datetime) -> bool:
-        """Check if a date is within reasonable bounds"""
+    def _get_date_bounds(self) -> Tuple[datetime, datetime]:
+        """Get the (min_date, max_date) window for reasonable dates"""
         now = datetime.now()
-        min_date = now - timedelta(days=self.date_tolerance_days)
-        max_date = now + timedelta(days=self.date_tolerance_days)
+        tolerance = timedelta(days=self.date_tolerance_days)
+        return now - tolerance, now + tolerance
+    
+    def _is_reasonable_date(self, date: datetime,
+                            date_bounds: Optional[Tuple[datetime, datetime]] = None) -> bool:
+        """Check if a date is within reasonable bounds"""
+        min_date, max_date = date_bounds or self._get_date_bounds()
         
         return min_date <= date <= max_date
     
     def _is_valid_email(self, email: str) -> bool:
         """Basic email format validation"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return _EMAIL_RE.match(email) is not None
     
-    def _calculate_validation_score(self, validation_results: List[Dict[str, Any]]) -> float:
-        """Calculate overall validation score based on results"""
-        if not validation_results:
+    def _calculate_validation_score(self, validation_results: List[ValidationCheck], passed_checks: int = 0) -> float:
+        """Calculate overall validation score based on failed checks and the passed-check count"""
+        if not validation_results and not passed_checks:
             return 0.0
         
-        total_score = 0.0
-        max_score = 0.0
+        # Passed checks are all low severity, so each earns its full weight of 1.0
+        total_score = float(passed_checks)
+        max_score = float(passed_checks)
         
         for result in validation_results:
-            severity = result.get("severity", "low")
-            status = result.get("status", "error")
-            
             # Weight by severity
-            weight = {"low": 1.0, "medium": 2.0, "high": 3.0}.get(severity, 1.0)
+            weight = SEVERITY_WEIGHTS.get(result.severity, 1.0)
             max_score += weight
             
             # Score by status
-            if status == "pass":
-                total_score += weight
-            elif status == "warning":
-                total_score += weight * 0.7
+            if result.status == "warning":
+                total_score += weight * WARNING_CREDIT
             # Errors get 0 points
         
         return total_score / max_score if max_score > 0 else 0.0
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Direct ctypes binding to OpenSSL's PKCS5_PBKDF2_HMAC for password hashing
+"""
+import ctypes
+import ctypes.util
+import logging
+import platform
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_libcrypto: Optional[ctypes.CDLL]
+try:
+    _libcrypto_path = ctypes.util.find_library('crypto')
+    if _libcrypto_path is None:
+        raise OSError("libcrypto not found")
+    _libcrypto = ctypes.CDLL(_libcrypto_path)
+
+    _libcrypto.EVP_sha256.restype = ctypes.c_void_p
+    _libcrypto.EVP_sha256.argtypes = []
+    _libcrypto.PKCS5_PBKDF2_HMAC.restype = ctypes.c_int
+    _libcrypto.PKCS5_PBKDF2_HMAC.argtypes = [
+        ctypes.c_char_p, ctypes.c_int,   # password, length
+        ctypes.c_char_p, ctypes.c_int,   # salt, length
+        ctypes.c_int,                    # iterations
+        ctypes.c_void_p,                 # digest (EVP_MD *)
+        ctypes.c_int,                    # key length
+        ctypes.c_char_p                  # output buffer
+    ]
+    _EVP_SHA256 = _libcrypto.EVP_sha256()
+    FAST_PBKDF2_AVAILABLE = True
+except (OSError, AttributeError):
+    _libcrypto = None
+    _EVP_SHA256 = None
+    FAST_PBKDF2_AVAILABLE = False
+
+
+def pbkdf2_sha256(password: bytes, salt: bytes, iterations: int, dklen: int = 32) -> Optional[bytes]:
+    """Derive a PBKDF2-HMAC-SHA256 key in libcrypto, or return None if it is unavailable or fails"""
+    _warn_if_scalar_sha256()
+    if _libcrypto is None:
+        return None
+
+    out = ctypes.create_string_buffer(dklen)
+    ok = _libcrypto.PKCS5_PBKDF2_HMAC(
+        password, len(password), salt, len(salt), iterations, _EVP_SHA256, dklen, out
+    )
+    return out.raw if ok == 1 else None
+
+
+def sha_extensions_available() -> Optional[bool]:
+    """Report whether SHA-256 can use the x86 SHA extensions, or None if it cannot be determined"""
+    if platform.machine().lower() not in ('x86_64', 'amd64', 'i386', 'i686'):
+        return None
+
+    # OpenSSL 1.1 exports its CPU capability vector; word 2 holds CPUID(7).EBX, bit 29 is SHA
+    if _libcrypto is not None:
+        try:
+            ia32cap = (ctypes.c_uint * 4).in_dll(_libcrypto, 'OPENSSL_ia32cap_P')
+            return bool(ia32cap[2] >> 29 & 1)
+        except ValueError:
+            pass
+
+    # OpenSSL 3 keeps it private but dispatches on the same CPU flag
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return 'sha_ni' in line.split()
+    except OSError:
+        pass
+    return None
+
+
+_scalar_warning_checked = False
+
+
+def _warn_if_scalar_sha256() -> None:
+    """Warn once, on the first PBKDF2-SHA256 derivation, if the CPU lacks SHA extensions"""
+    # scrypt is the default scheme, so only hosts that still verify PBKDF2 hashes get the warning
+    global _scalar_warning_checked
+    if _scalar_warning_checked:
+        return
+    _scalar_warning_checked = True
+    if sha_extensions_available() is False:
+        logger.warning("CPU lacks SHA extensions; PBKDF2-SHA256 password checks will use the slower scalar path")
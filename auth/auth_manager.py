@@ -1,15 +1,36 @@
 """
 Authentication manager for the invoice processing system
 """
+import atexit
 import json
 import os
+import threading
+import weakref
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 from .password_utils import PasswordUtils
 
+# Managers with possibly unsaved last_login updates; held weakly so exit-time
+# flushing does not keep every AuthManager ever built alive
+_live_managers: "weakref.WeakSet[AuthManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers():
+    """Write out pending last_login updates of every live AuthManager at exit"""
+    for manager in list(_live_managers):
+        manager._flush()
+
 
 class UserRole(Enum):
     """User roles for role-based access control"""
@@ -67,10 +88,18 @@ class AuthManager:
     def __init__(self, users_file: str = "config/users.json"):
         self.users_file = Path(users_file)
         self.users: Dict[str, User] = {}
-        self.failed_attempts: Dict[str, List[datetime]] = {}
         self.max_failed_attempts = 5
+        # username -> (failed attempt count, time of first failure in the window)
+        self._lock_state: Dict[str, Tuple[int, datetime]] = {}
         self.lockout_duration = timedelta(minutes=15)
         
+        # last_login updates are batched and flushed on a timer instead of per login
+        self.last_login_flush_interval = 60
+        self._dirty_last_login: set = set()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.RLock()
+        _live_managers.add(self)
+        
         # Ensure config directory exists
         self.users_file.parent.mkdir(exist_ok=True)
         
@@ -83,19 +112,60 @@ class AuthManager:
         """Load users from file"""
         if self.users_file.exists():
             try:
-                with open(self.users_file, 'r') as f:
-                    users_data = json.load(f)
-                    for username, user_data in users_data.items():
-                        self.users[username] = User.from_dict(user_data)
+                raw = self.users_file.read_bytes()
+                users_data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+                for username, user_data in users_data.items():
+                    self.users[username] = User.from_dict(user_data)
             except (json.JSONDecodeError, KeyError) as e:
                 print(f"Error loading users file: {e}")
                 self.users = {}
     
     def _save_users(self):
         """Save users to file"""
-        users_data = {username: user.to_dict() for username, user in self.users.items()}
-        with open(self.users_file, 'w') as f:
-            json.dump(users_data, f, indent=2)
+        with self._save_lock:
+            users_data = {username: user.to_dict() for username, user in self.users.items()}
+            if ORJSON_AVAILABLE:
+                payload = orjson.dumps(users_data, option=orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(users_data, indent=2).encode('utf-8')
+            
+            # Write to a temp file and swap it in so readers never see a partial file
+            tmp_file = self.users_file.with_suffix('.json.tmp')
+            tmp_file.write_bytes(payload)
+            os.replace(tmp_file, self.users_file)
+            
+            # The save persisted any pending last_login updates; a failed one keeps them pending
+            self._dirty_last_login.clear()
+    
+    def _schedule_flush(self):
+        """Start the last_login flush timer if one is not already pending"""
+        with self._save_lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.last_login_flush_interval, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _flush(self):
+        """Write out pending last_login updates"""
+        with self._save_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._dirty_last_login:
+                try:
+                    self._save_users()
+                except OSError as e:
+                    print(f"Error saving users file: {e}")
+                    self._schedule_flush()
+    
+    def close(self):
+        """Write out pending last_login updates and stop the flush timer"""
+        self._flush()
+        with self._save_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        _live_managers.discard(self)
     
     def _create_default_admin(self):
         """Create default admin user"""
@@ -118,46 +188,41 @@ class AuthManager:
         print(f"   Password: {default_password}")
         print("   ⚠️  Please change the default password immediately!")
     
-    def _is_account_locked(self, username: str) -> bool:
+    def _is_account_locked(self, username: str, now: Optional[datetime] = None) -> bool:
         """Check if account is locked due to failed attempts"""
-        if username not in self.failed_attempts:
+        state = self._lock_state.get(username)
+        if state is None or state[0] < self.max_failed_attempts:
             return False
         
-        recent_attempts = [
-            attempt for attempt in self.failed_attempts[username]
-            if datetime.now() - attempt < self.lockout_duration
-        ]
-        
-        return len(recent_attempts) >= self.max_failed_attempts
+        return (now or datetime.now()) - state[1] < self.lockout_duration
     
-    def _record_failed_attempt(self, username: str):
+    def _record_failed_attempt(self, username: str, now: Optional[datetime] = None):
         """Record a failed login attempt"""
-        if username not in self.failed_attempts:
-            self.failed_attempts[username] = []
+        now = now or datetime.now()
+        state = self._lock_state.get(username)
         
-        self.failed_attempts[username].append(datetime.now())
-        
-        # Clean up old attempts
-        cutoff = datetime.now() - self.lockout_duration
-        self.failed_attempts[username] = [
-            attempt for attempt in self.failed_attempts[username]
-            if attempt > cutoff
-        ]
+        # Start a new window once the previous one has expired
+        if state is None or now - state[1] > self.lockout_duration:
+            self._lock_state[username] = (1, now)
+        else:
+            self._lock_state[username] = (state[0] + 1, state[1])
     
     def _clear_failed_attempts(self, username: str):
         """Clear failed attempts for successful login"""
-        if username in self.failed_attempts:
-            del self.failed_attempts[username]
+        self._lock_state.pop(username, None)
     
     def authenticate(self, username: str, password: str) -> Tuple[bool, str, Optional[User]]:
         """Authenticate a user"""
+        # One timestamp for the lock check, attempt record and last_login
+        now = datetime.now()
+        
         # Check if account is locked
-        if self._is_account_locked(username):
+        if self._is_account_locked(username, now):
             return False, "Account is temporarily locked due to multiple failed attempts", None
         
         # Check if user exists
         if username not in self.users:
-            self._record_failed_attempt(username)
+            self._record_failed_attempt(username, now)
             return False, "Invalid username or password", None
         
         user = self.users[username]
@@ -168,13 +233,23 @@ class AuthManager:
         
         # Verify password
         if not PasswordUtils.verify_password(password, user.password_hash, user.salt):
-            self._record_failed_attempt(username)
+            self._record_failed_attempt(username, now)
             return False, "Invalid username or password", None
         
         # Successful login
         self._clear_failed_attempts(username)
-        user.last_login = datetime.now()
-        self._save_users()
+        user.last_login = now
+        
+        # Upgrade legacy PBKDF2 hashes while the plaintext password is at hand
+        if PasswordUtils.needs_rehash(user.password_hash):
+            password_hash, salt = PasswordUtils.create_password_hash(password)
+            with self._save_lock:
+                user.password_hash, user.salt = password_hash, salt
+                self._save_users()
+        else:
+            with self._save_lock:
+                self._dirty_last_login.add(username)
+            self._schedule_flush()
         
         return True, "Login successful", user
     
@@ -200,8 +275,12 @@ class AuthManager:
             salt=salt
         )
         
-        self.users[username] = user
-        self._save_users()
+        # The flush timer's save iterates self.users, so mutate it under the save lock
+        with self._save_lock:
+            if username in self.users:
+                return False, "Username already exists"
+            self.users[username] = user
+            self._save_users()
         
         return True, "User created successfully"
     
@@ -224,10 +303,11 @@ class AuthManager:
         
         # Update password
         password_hash, salt = PasswordUtils.create_password_hash(new_password)
-        user.password_hash = password_hash
-        user.salt = salt
-        
-        self._save_users()
+        with self._save_lock:
+            user.password_hash = password_hash
+            user.salt = salt
+            PasswordUtils.clear_verification_cache()
+            self._save_users()
         
         return True, "Password changed successfully"
     
@@ -247,8 +327,9 @@ class AuthManager:
         if username == "admin":
             return False, "Cannot deactivate admin user"
         
-        self.users[username].is_active = False
-        self._save_users()
+        with self._save_lock:
+            self.users[username].is_active = False
+            self._save_users()
         
         return True, "User deactivated successfully"
     
@@ -257,8 +338,9 @@ class AuthManager:
         if username not in self.users:
             return False, "User not found"
         
-        self.users[username].is_active = True
-        self._save_users()
+        with self._save_lock:
+            self.users[username].is_active = True
+            self._save_users()
         
         return True, "User activated successfully"
     
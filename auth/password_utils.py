@@ -2,27 +2,101 @@
 Password utilities for secure authentication
 """
 import hashlib
+import re
 import secrets
 import hmac
-from typing import Tuple
+import threading
+from collections import OrderedDict
+from typing import ClassVar, Dict, List, Optional, Tuple, Union
+
+from ._pbkdf2_fast import pbkdf2_sha256
+
+_SPECIAL_CHARS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+# Matches passwords that satisfy every strength rule, so strong ones need no per-class scan
+_STRONG_PASSWORD_RE = re.compile(
+    r'(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[!@#$%^&*()_+\-=\[\]{}|;:,.<>?]).{8,}',
+    re.DOTALL
+)
+
+# In-process cache of successful verifications, keyed by (stored hash, salt, keyed
+# MAC of the password) so plaintext passwords are never held. Only successes are
+# cached, so wrong passwords always pay the full KDF cost. Not shared across processes.
+_VERIFY_CACHE_SIZE = 1024
+_verify_cache_key = secrets.token_bytes(32)
+_verify_cache: "OrderedDict[Tuple[str, str, bytes], bool]" = OrderedDict()
+_verify_cache_lock = threading.Lock()
 
 
 class PasswordUtils:
     """Utility class for secure password handling"""
     
+    # Scheme for new hashes: "scrypt", or a PBKDF2 digest ("sha512", "sha256").
+    # Stored hashes carry their scheme (and PBKDF2 iteration count) as a
+    # "$"-separated prefix, so older hashes keep verifying after a change here.
+    HASH_ALGO: ClassVar[str] = "scrypt"
+    
+    # scrypt cost parameters; n * r * 128 bytes of memory per hash
+    SCRYPT_N: ClassVar[int] = 2 ** 15
+    SCRYPT_R: ClassVar[int] = 8
+    SCRYPT_P: ClassVar[int] = 1
+    SCRYPT_DKLEN: ClassVar[int] = 64
+    SCRYPT_MAXMEM: ClassVar[int] = 64 * 1024 * 1024
+    SCRYPT_PREFIX: ClassVar[str] = "scrypt$"
+    
+    # PBKDF2 iteration counts for new hashes, per digest
+    PBKDF2_ITERATIONS: ClassVar[Dict[str, int]] = {"sha512": 210000, "sha256": 600000}
+    
     @staticmethod
     def generate_salt() -> str:
         """Generate a random salt for password hashing"""
+        # The hex text itself is the KDF salt, so stored hashes depend on this form
         return secrets.token_hex(32)
     
     @staticmethod
-    def hash_password(password: str, salt: str) -> str:
-        """Hash a password with salt using PBKDF2"""
+    def _as_bytes(value: Union[str, bytes]) -> bytes:
+        """Encode a str as UTF-8; bytes are passed through unchanged"""
+        return value.encode('utf-8') if isinstance(value, str) else value
+    
+    @staticmethod
+    def hash_password(password: Union[str, bytes], salt: Union[str, bytes], algo: Optional[str] = None) -> str:
+        """Hash a password with salt using HASH_ALGO (or algo), in "<scheme>$..." format"""
+        algo = algo or PasswordUtils.HASH_ALGO
+        password_bytes = PasswordUtils._as_bytes(password)
+        salt_bytes = PasswordUtils._as_bytes(salt)
+        if algo == "scrypt":
+            hashed = hashlib.scrypt(
+                password_bytes,
+                salt=salt_bytes,
+                n=PasswordUtils.SCRYPT_N,
+                r=PasswordUtils.SCRYPT_R,
+                p=PasswordUtils.SCRYPT_P,
+                dklen=PasswordUtils.SCRYPT_DKLEN,
+                maxmem=PasswordUtils.SCRYPT_MAXMEM
+            )
+            return PasswordUtils.SCRYPT_PREFIX + hashed.hex()
+        
+        iterations = PasswordUtils.PBKDF2_ITERATIONS[algo]
+        return PasswordUtils._hash_pbkdf2_record(password_bytes, salt_bytes, algo, iterations)
+    
+    @staticmethod
+    def _hash_pbkdf2_record(password_bytes: bytes, salt_bytes: bytes, digest: str, iterations: int) -> str:
+        """Hash with PBKDF2-HMAC-<digest>, formatted as <digest>$<iterations>$<hex>"""
+        hashed = pbkdf2_sha256(password_bytes, salt_bytes, iterations) if digest == "sha256" else None
+        if hashed is None:
+            hashed = hashlib.pbkdf2_hmac(digest, password_bytes, salt_bytes, iterations)
+        return f"{digest}${iterations}${hashed.hex()}"
+    
+    @staticmethod
+    def hash_password_pbkdf2(password: Union[str, bytes], salt: Union[str, bytes]) -> str:
+        """Hash a password with salt using PBKDF2 (format of hashes stored before scrypt)"""
         # Use PBKDF2 with SHA-256, 100,000 iterations
-        password_bytes = password.encode('utf-8')
-        salt_bytes = salt.encode('utf-8')
+        password_bytes = PasswordUtils._as_bytes(password)
+        salt_bytes = PasswordUtils._as_bytes(salt)
         
-        hashed = hashlib.pbkdf2_hmac('sha256', password_bytes, salt_bytes, 100000)
+        # Call libcrypto directly when it can be loaded, otherwise go through hashlib
+        hashed = pbkdf2_sha256(password_bytes, salt_bytes, 100000)
+        if hashed is None:
+            hashed = hashlib.pbkdf2_hmac('sha256', password_bytes, salt_bytes, 100000)
         return hashed.hex()
     
     @staticmethod
@@ -35,27 +109,79 @@ class PasswordUtils:
     @staticmethod
     def verify_password(password: str, stored_hash: str, salt: str) -> bool:
         """Verify a password against stored hash and salt"""
-        computed_hash = PasswordUtils.hash_password(password, salt)
-        return hmac.compare_digest(stored_hash, computed_hash)
+        # Encode once; the MAC and the KDF below share these bytes
+        password_bytes = password.encode('utf-8')
+        password_mac = hmac.new(_verify_cache_key, password_bytes, hashlib.sha256).digest()
+        cache_key = (stored_hash, salt, password_mac)
+        with _verify_cache_lock:
+            if cache_key in _verify_cache:
+                _verify_cache.move_to_end(cache_key)
+                return True
+        
+        # Recompute with the scheme recorded in the stored hash; bare hex hashes
+        # predate the prefix and are PBKDF2-SHA256 with 100,000 iterations
+        scheme, _, params = stored_hash.partition("$")
+        salt_bytes = salt.encode('utf-8')
+        try:
+            if not params:
+                computed_hash = PasswordUtils.hash_password_pbkdf2(password_bytes, salt_bytes)
+            elif scheme == "scrypt":
+                computed_hash = PasswordUtils.hash_password(password_bytes, salt_bytes, "scrypt")
+            else:
+                iterations = int(params.split("$", 1)[0])
+                computed_hash = PasswordUtils._hash_pbkdf2_record(password_bytes, salt_bytes, scheme, iterations)
+        except ValueError:
+            # Unknown digest or malformed record
+            return False
+        verified = hmac.compare_digest(stored_hash, computed_hash)
+        
+        if verified:
+            with _verify_cache_lock:
+                _verify_cache[cache_key] = True
+                if len(_verify_cache) > _VERIFY_CACHE_SIZE:
+                    _verify_cache.popitem(last=False)
+        return verified
+    
+    @staticmethod
+    def clear_verification_cache() -> None:
+        """Forget all cached successful password verifications"""
+        with _verify_cache_lock:
+            _verify_cache.clear()
     
     @staticmethod
-    def is_password_strong(password: str) -> Tuple[bool, list]:
+    def needs_rehash(stored_hash: str) -> bool:
+        """Check if a stored hash uses an older scheme or cost and should be upgraded"""
+        scheme, _, params = stored_hash.partition("$")
+        if not params or scheme != PasswordUtils.HASH_ALGO:
+            return True
+        if scheme == "scrypt":
+            return False
+        iterations = params.split("$", 1)[0]
+        return not iterations.isdigit() or int(iterations) < PasswordUtils.PBKDF2_ITERATIONS[scheme]
+    
+    @staticmethod
+    def is_password_strong(password: str) -> Tuple[bool, List[str]]:
         """Check if password meets security requirements"""
-        errors = []
+        if _STRONG_PASSWORD_RE.fullmatch(password):
+            return True, []
+        
+        errors: List[str] = []
+        # Each distinct character only needs to be classified once
+        chars = set(password)
         
         if len(password) < 8:
             errors.append("Password must be at least 8 characters long")
         
-        if not any(c.isupper() for c in password):
+        if not any(c.isupper() for c in chars):
             errors.append("Password must contain at least one uppercase letter")
         
-        if not any(c.islower() for c in password):
+        if not any(c.islower() for c in chars):
             errors.append("Password must contain at least one lowercase letter")
         
-        if not any(c.isdigit() for c in password):
+        if not any(c.isdigit() for c in chars):
             errors.append("Password must contain at least one digit")
         
-        if not any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password):
+        if _SPECIAL_CHARS.isdisjoint(chars):
             errors.append("Password must contain at least one special character")
         
         return len(errors) == 0, errors
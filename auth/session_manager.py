@@ -1,47 +1,85 @@
 """
 Session management for the invoice processing system
 """
+import atexit
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import streamlit as st
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 from .password_utils import PasswordUtils
 
+SESSION_LIFETIME_SECONDS = 24 * 60 * 60
+
+
+def _encode_default(obj: Any) -> Dict:
+    """Serialize Session objects found in journal records"""
+    if isinstance(obj, Session):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode_record(record: Dict) -> bytes:
+    """Encode a sessions journal record as one JSON line"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(record, default=_encode_default, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(record, default=_encode_default).encode('utf-8') + b'\n'
+
+
+def _decode(data: bytes) -> Any:
+    """Parse JSON bytes with orjson when available"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
 
 class Session:
-    """Session data class"""
-    def __init__(self, session_id: str, username: str, created_at: datetime = None,
-                 last_activity: datetime = None, expires_at: datetime = None):
+    """Session data class; timestamps are epoch seconds from time.time()"""
+    
+    __slots__ = ("session_id", "username", "created_at", "last_activity", "expires_at")
+    
+    def __init__(self, session_id: str, username: str, created_at: Optional[float] = None,
+                 last_activity: Optional[float] = None, expires_at: Optional[float] = None):
+        now = time.time()
         self.session_id = session_id
         self.username = username
-        self.created_at = created_at or datetime.now()
-        self.last_activity = last_activity or datetime.now()
-        self.expires_at = expires_at or (datetime.now() + timedelta(hours=24))
+        self.created_at = created_at or now
+        self.last_activity = last_activity or now
+        self.expires_at = expires_at or (now + SESSION_LIFETIME_SECONDS)
     
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if session is expired"""
-        return datetime.now() > self.expires_at
+        return (now or time.time()) > self.expires_at
     
-    def is_inactive(self, max_inactive_time: timedelta = timedelta(hours=2)) -> bool:
+    def is_inactive(self, max_inactive_time: timedelta = timedelta(hours=2),
+                    now: Optional[float] = None) -> bool:
         """Check if session has been inactive too long"""
-        return datetime.now() - self.last_activity > max_inactive_time
+        return (now or time.time()) - self.last_activity > max_inactive_time.total_seconds()
     
     def refresh(self):
         """Refresh session activity"""
-        self.last_activity = datetime.now()
+        self.last_activity = time.time()
     
     def to_dict(self) -> Dict:
         """Convert session to dictionary"""
         return {
             'session_id': self.session_id,
             'username': self.username,
-            'created_at': self.created_at.isoformat(),
-            'last_activity': self.last_activity.isoformat(),
-            'expires_at': self.expires_at.isoformat()
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'last_activity': datetime.fromtimestamp(self.last_activity).isoformat(),
+            'expires_at': datetime.fromtimestamp(self.expires_at).isoformat()
         }
     
     @classmethod
@@ -50,118 +88,392 @@ class Session:
         return cls(
             session_id=data['session_id'],
             username=data['username'],
-            created_at=datetime.fromisoformat(data['created_at']),
-            last_activity=datetime.fromisoformat(data['last_activity']),
-            expires_at=datetime.fromisoformat(data['expires_at'])
+            created_at=datetime.fromisoformat(data['created_at']).timestamp(),
+            last_activity=datetime.fromisoformat(data['last_activity']).timestamp(),
+            expires_at=datetime.fromisoformat(data['expires_at']).timestamp()
         )
 
 
 class SessionManager:
     """Manages user sessions"""
     
-    def __init__(self, sessions_file: str = "config/sessions.json"):
+    def __init__(self, sessions_file: str = "config/sessions.log"):
         self.sessions_file = Path(sessions_file)
         self.sessions: Dict[str, Session] = {}
         self.session_timeout = timedelta(hours=24)
         self.inactive_timeout = timedelta(hours=2)
         
+        # The sessions file is an append-only JSONL journal of "put"/"del" records.
+        # A background flusher coalesces records queued within flush_interval seconds
+        # into one write + fsync; destroys are written immediately. The journal is
+        # compacted once it holds compact_ratio times more records than live sessions.
+        # Request threads only enqueue records; they never wait on file I/O.
+        self.flush_interval = 0.05
+        self.cleanup_interval = 60.0
+        self.compact_ratio = 10
+        self._pending: "queue.SimpleQueue[Dict]" = queue.SimpleQueue()
+        self._journal_records = 0
+        self._next_cleanup = 0.0
+        self._fh = None
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        
+        # Column index over the sessions for vectorized expiry sweeps: row i holds
+        # session _row_ids[i]; deletes move the last row into the freed slot
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._expires = np.empty(64, dtype=np.float64)
+        self._last_activity = np.empty(64, dtype=np.float64)
+        
         # Ensure config directory exists
         self.sessions_file.parent.mkdir(exist_ok=True)
         
-        # Load existing sessions
+        # Load existing sessions; expired ones are dropped while loading, so the
+        # first periodic cleanup can wait a full interval
         self._load_sessions()
+        for session in self.sessions.values():
+            self._index_session(session)
+        self._next_cleanup = time.monotonic() + self.cleanup_interval
+        
+        # Keep the journal open for appends and start the background flusher
+        self._open_journal()
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+    
+    def close(self):
+        """Stop the background flusher, write pending records and close the journal"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join()
         
-        # Clean up expired sessions
-        self._cleanup_sessions()
+        self.flush()
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        atexit.unregister(self.close)
+    
+    def _open_journal(self):
+        """Open the sessions journal for buffered appends"""
+        self._fh = open(self.sessions_file, 'ab', buffering=128 * 1024)
+    
+    def _current_journal(self):
+        """Return the append handle, reopened if the file was replaced since it was opened"""
+        # Another manager on the same file may have compacted it; appends to the
+        # old, unlinked inode would be lost
+        try:
+            current_inode = os.stat(self.sessions_file).st_ino
+        except FileNotFoundError:
+            current_inode = None
+        if os.fstat(self._fh.fileno()).st_ino != current_inode:
+            self._fh.close()
+            self._open_journal()
+        return self._fh
+    
+    def _flush_loop(self):
+        """Background flusher: write queued records together and run the periodic cleanup"""
+        while not self._closed.is_set():
+            # One failed write or sweep must not stop the flusher; records from a
+            # failed write stay queued and are retried on the next flush
+            try:
+                if self._wakeup.wait(timeout=self.cleanup_interval):
+                    if self._closed.is_set():
+                        return
+                    # Let more records arrive so they share one write
+                    time.sleep(self.flush_interval)
+                    self._wakeup.clear()
+                    self.flush()
+                self._maybe_cleanup_sessions()
+            except Exception as e:
+                print(f"Session flusher error: {e}")
     
     def _load_sessions(self):
-        """Load sessions from file"""
-        if self.sessions_file.exists():
+        """Load sessions by replaying the journal, or import a legacy sessions.json"""
+        if not self.sessions_file.exists():
+            self._import_legacy_sessions()
+            return
+        
+        now = time.time()
+        inactive_cutoff = now - self.inactive_timeout.total_seconds()
+        
+        line = b''
+        with open(self.sessions_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = _decode(line)
+                    if record['op'] == 'put':
+                        session_data = record['session']
+                        # A later put supersedes earlier ones, so an expired put also drops them
+                        if self._is_live_record(session_data, now, inactive_cutoff):
+                            self.sessions[session_data['session_id']] = Session.from_dict(session_data)
+                        else:
+                            self.sessions.pop(session_data['session_id'], None)
+                    elif record['op'] == 'del':
+                        self.sessions.pop(record['session_id'], None)
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                    # A torn final write or a bad record only loses that record
+                    print(f"Skipping bad sessions journal record: {e}")
+                    continue
+                self._journal_records += 1
+        
+        if line and not line.endswith(b'\n'):
+            # Terminate a torn final record so the next append starts on its own line
+            with open(self.sessions_file, 'ab') as f:
+                f.write(b'\n')
+    
+    def _import_legacy_sessions(self):
+        """Import sessions from the old whole-file sessions.json format"""
+        legacy_file = self.sessions_file.with_suffix('.json')
+        if legacy_file == self.sessions_file or not legacy_file.exists():
+            return
+        
+        now = time.time()
+        inactive_cutoff = now - self.inactive_timeout.total_seconds()
+        
+        try:
+            sessions_data = _decode(legacy_file.read_bytes())
+            for session_id, session_data in sessions_data.items():
+                if self._is_live_record(session_data, now, inactive_cutoff):
+                    self.sessions[session_id] = Session.from_dict(session_data)
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"Error loading sessions file: {e}")
+            self.sessions = {}
+        
+        if self.sessions:
+            self._compact()
+    
+    @staticmethod
+    def _is_live_record(session_data: Dict, now: float, inactive_cutoff: float) -> bool:
+        """Check a stored session's expiry without building a Session"""
+        return (datetime.fromisoformat(session_data['expires_at']).timestamp() >= now
+                and datetime.fromisoformat(session_data['last_activity']).timestamp() >= inactive_cutoff)
+    
+    def _journal(self, record: Dict, immediate: bool = False):
+        """Queue a journal record for the flusher, or write it now if immediate"""
+        self._pending.put(record)
+        if immediate:
+            self.flush()
+        else:
+            self._wakeup.set()
+    
+    def flush(self):
+        """Append any pending journal records to the sessions file with a single fsync"""
+        with self._lock:
+            batch = self._drain_pending()
+            if not batch:
+                return
+            
+            # Records hold full session state, so only the last one per session in
+            # the batch needs writing; put records are encoded from the live Session
+            latest: Dict[str, Dict] = {}
+            for record in batch:
+                session_id = record['session'].session_id if record['op'] == 'put' else record['session_id']
+                latest.pop(session_id, None)
+                latest[session_id] = record
+            batch = list(latest.values())
+            
+            data = b''.join(_encode_record(record) for record in batch)
             try:
-                with open(self.sessions_file, 'r') as f:
-                    sessions_data = json.load(f)
-                    for session_id, session_data in sessions_data.items():
-                        self.sessions[session_id] = Session.from_dict(session_data)
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error loading sessions file: {e}")
-                self.sessions = {}
-    
-    def _save_sessions(self):
-        """Save sessions to file"""
-        sessions_data = {session_id: session.to_dict() 
-                        for session_id, session in self.sessions.items()}
-        with open(self.sessions_file, 'w') as f:
-            json.dump(sessions_data, f, indent=2)
+                if self._fh is None:
+                    # Closed: append by path without keeping a handle open
+                    with open(self.sessions_file, 'ab') as fh:
+                        self._write_synced(fh, data)
+                    return
+                
+                self._write_synced(self._current_journal(), data)
+            except OSError:
+                # Requeue so the records are written by a later flush; records hold
+                # full session state, so a retried write that partly repeats is harmless
+                for record in batch:
+                    self._pending.put(record)
+                raise
+            self._journal_records += len(batch)
+            
+            if self._journal_records > self.compact_ratio * max(len(self.sessions), 1):
+                self._compact()
+    
+    @staticmethod
+    def _write_synced(fh, data: bytes):
+        """Write data to an append handle and fsync it"""
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    
+    def _drain_pending(self) -> List[Dict]:
+        """Take every record queued so far"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                return batch
+    
+    def _compact(self):
+        """Rewrite the journal as one "put" record per live session"""
+        with self._lock:
+            # Queued records are already reflected in the in-memory sessions. Drain
+            # them before the snapshot: anything queued later is written afterwards
+            self._drain_pending()
+            sessions = list(self.sessions.values())
+            tmp_file = self.sessions_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb', buffering=128 * 1024) as f:
+                f.write(b''.join(
+                    _encode_record({'op': 'put', 'session': session})
+                    for session in sessions
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            
+            # Swap in the compacted file and reopen the append handle on it
+            if self._fh is not None:
+                self._fh.close()
+            os.replace(tmp_file, self.sessions_file)
+            if self._fh is not None:
+                self._open_journal()
+            
+            self._journal_records = len(sessions)
+    
+    def _index_session(self, session: Session):
+        """Add or update a session's row in the expiry columns"""
+        with self._lock:
+            row = self._rows.get(session.session_id)
+            if row is None:
+                row = len(self._row_ids)
+                if row == len(self._expires):
+                    self._expires = np.resize(self._expires, row * 2)
+                    self._last_activity = np.resize(self._last_activity, row * 2)
+                self._row_ids.append(session.session_id)
+                self._rows[session.session_id] = row
+            self._expires[row] = session.expires_at
+            self._last_activity[row] = session.last_activity
+    
+    def _unindex_session(self, session_id: str):
+        """Remove a session's row from the expiry columns"""
+        with self._lock:
+            row = self._rows.pop(session_id, None)
+            if row is None:
+                return
+            last = len(self._row_ids) - 1
+            if row != last:
+                moved_id = self._row_ids[last]
+                self._row_ids[row] = moved_id
+                self._rows[moved_id] = row
+                self._expires[row] = self._expires[last]
+                self._last_activity[row] = self._last_activity[last]
+            self._row_ids.pop()
+    
+    def _maybe_cleanup_sessions(self):
+        """Run _cleanup_sessions at most once per cleanup_interval"""
+        now = time.monotonic()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            self._cleanup_sessions()
     
     def _cleanup_sessions(self):
         """Remove expired and inactive sessions"""
-        expired_sessions = []
-        
-        for session_id, session in self.sessions.items():
-            if session.is_expired() or session.is_inactive(self.inactive_timeout):
-                expired_sessions.append(session_id)
+        now = time.time()
+        inactive_cutoff = now - self.inactive_timeout.total_seconds()
         
-        for session_id in expired_sessions:
-            del self.sessions[session_id]
-        
-        if expired_sessions:
-            self._save_sessions()
+        with self._lock:
+            count = len(self._row_ids)
+            dead = (self._expires[:count] < now) | (self._last_activity[:count] < inactive_cutoff)
+            expired_sessions = [self._row_ids[row] for row in np.flatnonzero(dead).tolist()]
+            
+            # Expired sessions are dropped again on startup and by compaction, so they
+            # need no journal records of their own
+            for session_id in expired_sessions:
+                self.sessions.pop(session_id, None)
+                self._unindex_session(session_id)
     
     def create_session(self, username: str) -> str:
         """Create a new session for user"""
         session_id = PasswordUtils.generate_secure_token()
         session = Session(session_id, username)
         
-        self.sessions[session_id] = session
-        self._save_sessions()
+        with self._lock:
+            self.sessions[session_id] = session
+            self._index_session(session)
+            self._journal({'op': 'put', 'session': session})
         
         return session_id
     
     def get_session(self, session_id: str) -> Optional[Session]:
         """Get session by ID"""
-        self._cleanup_sessions()
-        
-        if session_id not in self.sessions:
-            return None
-        
-        session = self.sessions[session_id]
-        
-        if session.is_expired() or session.is_inactive(self.inactive_timeout):
-            self.destroy_session(session_id)
-            return None
-        
-        # Refresh session activity
-        session.refresh()
-        self._save_sessions()
+        # Only the requested session is checked here; the background flusher
+        # sweeps the rest every cleanup_interval
+        with self._lock:
+            # Held through the put record so a concurrent destroy or sweep cannot
+            # run in between and have the session re-indexed or re-journaled
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            
+            if session.is_expired() or session.is_inactive(self.inactive_timeout):
+                self.destroy_session(session_id)
+                return None
+            
+            # Refresh session activity
+            session.refresh()
+            self._index_session(session)
+            self._journal({'op': 'put', 'session': session})
         
         return session
     
     def destroy_session(self, session_id: str):
         """Destroy a session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            self._save_sessions()
+        with self._lock:
+            if self.sessions.pop(session_id, None) is not None:
+                self._unindex_session(session_id)
+                self._journal({'op': 'del', 'session_id': session_id}, immediate=True)
     
     def destroy_user_sessions(self, username: str):
         """Destroy all sessions for a user"""
-        user_sessions = [session_id for session_id, session in self.sessions.items()
-                        if session.username == username]
-        
-        for session_id in user_sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            user_sessions = [session_id for session_id, session in self.sessions.items()
+                            if session.username == username]
+            
+            for session_id in user_sessions:
+                del self.sessions[session_id]
+                self._unindex_session(session_id)
+                self._journal({'op': 'del', 'session_id': session_id})
         
         if user_sessions:
-            self._save_sessions()
+            self.flush()
+        
+        # Cached password verifications must not outlive a forced logout
+        PasswordUtils.clear_verification_cache()
     
     def get_active_sessions(self, username: str = None) -> list:
         """Get list of active sessions"""
-        self._cleanup_sessions()
-        
-        if username:
-            return [session for session in self.sessions.values()
-                   if session.username == username]
-        else:
-            return list(self.sessions.values())
+        with self._lock:
+            self._cleanup_sessions()
+            
+            if username:
+                return [session for session in self.sessions.values()
+                       if session.username == username]
+            else:
+                return list(self.sessions.values())
+
+
+_shared_managers: Dict[Path, SessionManager] = {}
+_shared_managers_lock = threading.Lock()
+
+
+def get_session_manager(sessions_file: str = "config/sessions.log") -> SessionManager:
+    """Return the process-wide SessionManager for a sessions file, creating it on first use"""
+    # One manager per file: each instance holds a flusher thread and an open
+    # journal, and separate instances would not see each other's sessions
+    path = Path(sessions_file).resolve()
+    with _shared_managers_lock:
+        manager = _shared_managers.get(path)
+        if manager is None:
+            manager = _shared_managers[path] = SessionManager(sessions_file)
+        return manager
 
 
 class StreamlitSessionManager:
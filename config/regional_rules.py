@@ -1,7 +1,10 @@
 """
 Regional rules and regulations for invoice processing
 """
-from typing import Dict, List, Any
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Sequence
 from enum import Enum
 
 
@@ -209,34 +212,67 @@ VALIDATION_RULES = {
 }
 
 
-def get_regional_rules(region: str) -> Dict[str, Any]:
+def _compile_formats(rules: Dict[str, Any]) -> None:
+    """Add a precompiled "<key>_re" pattern next to every "*_format"/"pattern" regex string"""
+    for key, value in list(rules.items()):
+        if isinstance(value, dict):
+            _compile_formats(value)
+        elif key.endswith("_format") and key != "date_format" or key == "pattern":
+            rules[f"{key}_re"] = re.compile(value)
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively make rules read-only: dicts become mapping proxies, lists become tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Rules are shared by every caller, so freeze them once at import
+_compile_formats(REGIONAL_RULES)
+_compile_formats(VALIDATION_RULES)
+for _rules in REGIONAL_RULES.values():
+    _rules["required_fields_set"] = frozenset(_rules["required_fields"])
+REGIONAL_RULES = _freeze(REGIONAL_RULES)
+VALIDATION_RULES = _freeze(VALIDATION_RULES)
+
+SUPPORTED_REGIONS_SET = frozenset(r.value for r in Region)
+
+
+@lru_cache(maxsize=32)
+def get_regional_rules(region: str) -> Mapping[str, Any]:
     """Get rules for a specific region"""
     return REGIONAL_RULES.get(region, REGIONAL_RULES[Region.US.value])
 
 
-def get_validation_rules() -> Dict[str, Any]:
+def get_validation_rules() -> Mapping[str, Any]:
     """Get general validation rules"""
     return VALIDATION_RULES
 
 
-def get_supported_currencies(region: str) -> List[str]:
+@lru_cache(maxsize=32)
+def get_supported_currencies(region: str) -> Sequence[str]:
     """Get supported currencies for a region"""
     rules = get_regional_rules(region)
-    return rules.get("currency", ["USD"])
+    return rules.get("currency", ("USD",))
 
 
-def get_tax_types(region: str) -> List[str]:
+@lru_cache(maxsize=32)
+def get_tax_types(region: str) -> Sequence[str]:
     """Get supported tax types for a region"""
     rules = get_regional_rules(region)
-    return rules.get("tax_types", [TaxType.SALES_TAX.value])
+    return rules.get("tax_types", (TaxType.SALES_TAX.value,))
 
 
-def get_approval_limits(region: str) -> Dict[str, float]:
+@lru_cache(maxsize=32)
+def get_approval_limits(region: str) -> Mapping[str, float]:
     """Get approval limits for a region"""
     rules = get_regional_rules(region)
-    return rules.get("approval_rules", {})
+    return rules.get("approval_rules", MappingProxyType({}))
 
 
 def validate_region(region: str) -> bool:
     """Validate if region is supported"""
-    return region in [r.value for r in Region]
\ No newline at end of file
+    return region in SUPPORTED_REGIONS_SET
\ No newline at end of file
@@ -7,47 +7,64 @@ from typing import Dict, Any
 
 
 class Settings:
-    """Application settings"""
-
-    def __init__(self):
-        # Base paths
-        self.BASE_DIR = Path(__file__).resolve().parent.parent
-        self.DATA_DIR = self.BASE_DIR / "data"
-        self.LOGS_DIR = self.BASE_DIR / "logs"
-        self.INDEX_DIR = self.DATA_DIR / "index"
-        self.INVOICES_DIR = self.DATA_DIR / "invoices"
-        self.PROCESSED_DIR = self.DATA_DIR / "processed"
+    """Application settings, read from the environment once at import"""
+
+    @classmethod
+    def load_from_env(cls):
+        """(Re)read all settings from the environment onto the class"""
+        env = os.environ
+
+        # Base paths; __file__ is already absolute for imported modules
+        cls.BASE_DIR = Path(__file__).parent.parent
+        cls.DATA_DIR = cls.BASE_DIR / "data"
+        cls.LOGS_DIR = cls.BASE_DIR / "logs"
+        cls.INDEX_DIR = cls.DATA_DIR / "index"
+        cls.INVOICES_DIR = cls.DATA_DIR / "invoices"
+        cls.PROCESSED_DIR = cls.DATA_DIR / "processed"
+        cls.PIPELINE_CACHE_DIR = cls.DATA_DIR / "pipeline_cache"
 
         # Ollama Configuration
-        self.OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        self.OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2:7b")  # Using lighter model for better performance
-        self.OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+        cls.OLLAMA_BASE_URL = env.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        cls.OLLAMA_MODEL = env.get("OLLAMA_MODEL", "llama2:7b")  # Using lighter model for better performance
+        cls.OLLAMA_EMBEDDING_MODEL = env.get("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+        # Concurrent requests to send; match the server's own OLLAMA_NUM_PARALLEL
+        cls.OLLAMA_NUM_PARALLEL = int(env.get("OLLAMA_NUM_PARALLEL", "4"))
 
         # LlamaIndex Configuration
-        self.CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1024"))
-        self.CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "128"))
-        self.SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", "5"))
+        cls.CHUNK_SIZE = int(env.get("CHUNK_SIZE", "1024"))
+        cls.CHUNK_OVERLAP = int(env.get("CHUNK_OVERLAP", "128"))
+        cls.SIMILARITY_TOP_K = int(env.get("SIMILARITY_TOP_K", "5"))
 
         # Agent Configuration
-        self.MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
-        self.AGENT_TIMEOUT = int(os.getenv("AGENT_TIMEOUT", "30"))
+        cls.MAX_RETRIES = int(env.get("MAX_RETRIES", "3"))
+        cls.AGENT_TIMEOUT = int(env.get("AGENT_TIMEOUT", "30"))
+        # Characters of invoice text put into each LLM prompt, roughly 4 per token
+        cls.EXTRACTION_TEXT_LIMIT = int(env.get("EXTRACTION_TEXT_LIMIT", "3000"))
+        cls.VALIDATION_TEXT_LIMIT = int(env.get("VALIDATION_TEXT_LIMIT", "2000"))
+
+        # LLM extraction cache; entries older than the TTL (seconds, 0 = never) are re-extracted
+        cls.PIPELINE_CACHE_ENABLED = env.get("PIPELINE_CACHE_ENABLED", "true").lower() == "true"
+        cls.PIPELINE_CACHE_TTL = float(env.get("PIPELINE_CACHE_TTL", str(7 * 24 * 3600)))
 
         # Regional Settings
-        self.SUPPORTED_REGIONS = ["US", "EU", "APAC", "LATAM"]
-        self.DEFAULT_REGION = os.getenv("DEFAULT_REGION", "US")
+        cls.SUPPORTED_REGIONS = frozenset(("US", "EU", "APAC", "LATAM"))
+        cls.DEFAULT_REGION = env.get("DEFAULT_REGION", "US")
 
         # Processing Configuration
-        self.CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.85"))
-        self.VALIDATION_THRESHOLD = float(os.getenv("VALIDATION_THRESHOLD", "0.75"))
-        self.AUTO_APPROVE_THRESHOLD = float(os.getenv("AUTO_APPROVE_THRESHOLD", "0.95"))
+        cls.CONFIDENCE_THRESHOLD = float(env.get("CONFIDENCE_THRESHOLD", "0.85"))
+        cls.VALIDATION_THRESHOLD = float(env.get("VALIDATION_THRESHOLD", "0.75"))
+        cls.AUTO_APPROVE_THRESHOLD = float(env.get("AUTO_APPROVE_THRESHOLD", "0.95"))
 
         # UI Configuration
-        self.STREAMLIT_PORT = int(os.getenv("STREAMLIT_PORT", "8501"))
-        self.DEBUG_MODE = os.getenv("DEBUG_MODE", "true").lower() == "true"
+        cls.STREAMLIT_PORT = int(env.get("STREAMLIT_PORT", "8501"))
+        cls.DEBUG_MODE = env.get("DEBUG_MODE", "true").lower() == "true"
 
         # Logging Configuration
-        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-        self.LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        cls.LOG_LEVEL = env.get("LOG_LEVEL", "INFO")
+        cls.LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+Settings.load_from_env()
 
 
 # Global settings instance
@@ -5,29 +5,55 @@ This is the main entry point for the invoice processing system.
 It provides both CLI and web interfaces for processing invoices.
 """
 import argparse
+import asyncio
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import List, Optional
 
 from config.settings import settings, create_directories
-from orchestrator import AgentCoordinator, WorkflowManager, WorkflowType
+
+# Workflow names for --workflow, mirroring orchestrator.WorkflowType. The orchestrator
+# pulls in every agent, so it is only imported by the commands that run them.
+WORKFLOW_CHOICES = ("standard", "fast_track", "detailed_review", "compliance_only", "custom")
 
 
 def setup_logging():
     """Set up logging configuration"""
+    formatter = logging.Formatter(settings.LOG_FORMAT)
+    handlers = [
+        logging.FileHandler(settings.LOGS_DIR / "system.log"),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    # Log calls only enqueue records; a listener thread formats and writes them
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Records are formatted by the listener's handlers; only merge args into the message here
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
     logging.basicConfig(
         level=getattr(logging, settings.LOG_LEVEL),
-        format=settings.LOG_FORMAT,
-        handlers=[
-            logging.FileHandler(settings.LOGS_DIR / "system.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
+        handlers=[queue_handler]
     )
 
 
 def run_cli_processing(files: List[str], workflow: str, batch: bool = False):
     """Run processing via CLI"""
+    from orchestrator import AgentCoordinator, WorkflowManager, WorkflowType
+    
+    # The orchestrator is loaded now anyway, so catch the choices drifting from the enum
+    assert WORKFLOW_CHOICES == tuple(wf.value for wf in WorkflowType), "WORKFLOW_CHOICES is out of date"
+    
     logger = logging.getLogger(__name__)
     
     try:
@@ -47,17 +73,20 @@ def run_cli_processing(files: List[str], workflow: str, batch: bool = False):
         if batch and len(files) > 1:
             logger.info(f"Starting batch processing of {len(files)} files with workflow '{workflow}'")
             
-            # Use agent coordinator's batch processing
-            batch_result = agent_coordinator.process_batch(files)
+            # Run the files' pipelines concurrently, up to OLLAMA_NUM_PARALLEL at a time
+            batch_result = asyncio.run(agent_coordinator.process_batch_async(files))
             
             # Print results
-            print(f"\nBatch Processing Results:")
-            print(f"Total files: {batch_result['total_files']}")
-            print(f"Processed: {batch_result['processed']}")
-            print(f"Successful: {batch_result['successful']}")
-            print(f"Failed: {batch_result['failed']}")
-            print(f"Pending Review: {batch_result['pending_review']}")
-            print(f"Processing time: {batch_result['processing_time']:.2f}s")
+            out = [
+                f"\nBatch Processing Results:",
+                f"Total files: {batch_result['total_files']}",
+                f"Processed: {batch_result['processed']}",
+                f"Successful: {batch_result['successful']}",
+                f"Failed: {batch_result['failed']}",
+                f"Pending Review: {batch_result['pending_review']}",
+                f"Processing time: {batch_result['processing_time']:.2f}s"
+            ]
+            sys.stdout.write("\n".join(out) + "\n")
             
         else:
             # Process individual files
@@ -69,24 +98,27 @@ def run_cli_processing(files: List[str], workflow: str, batch: bool = False):
                     input_data=file_path
                 )
                 
-                # Print results
-                print(f"\nProcessing Results for {Path(file_path).name}:")
-                print(f"Status: {result['status']}")
-                print(f"Confidence: {result['confidence_score']:.1%}")
-                print(f"Processing time: {result['processing_time']:.2f}s")
-                print(f"Errors: {len(result['errors'])}")
-                print(f"Warnings: {len(result['warnings'])}")
+                # Print results; each file's report goes out in one write
+                out = [
+                    f"\nProcessing Results for {Path(file_path).name}:",
+                    f"Status: {result['status']}",
+                    f"Confidence: {result['confidence_score']:.1%}",
+                    f"Processing time: {result['processing_time']:.2f}s",
+                    f"Errors: {len(result['errors'])}",
+                    f"Warnings: {len(result['warnings'])}"
+                ]
                 
                 if result['errors']:
-                    print("Errors:")
-                    for error in result['errors']:
-                        print(f"  - {error}")
+                    out.append("Errors:")
+                    out.extend(f"  - {error}" for error in result['errors'])
                 
                 if result['invoice']:
                     invoice = result['invoice']
-                    print(f"Invoice Number: {invoice.invoice_number}")
-                    print(f"Vendor: {invoice.vendor_name}")
-                    print(f"Total: {invoice.currency} {invoice.total_amount:,.2f}")
+                    out.append(f"Invoice Number: {invoice.invoice_number}")
+                    out.append(f"Vendor: {invoice.vendor_name}")
+                    out.append(f"Total: {invoice.currency} {invoice.total_amount:,.2f}")
+                
+                sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
@@ -116,6 +148,8 @@ def run_web_interface():
 
 def run_system_health_check():
     """Run system health check"""
+    from orchestrator import AgentCoordinator
+    
     logger = logging.getLogger(__name__)
     
     try:
@@ -165,6 +199,10 @@ Examples:
   
   # Run health check
   python main.py health
+
+Environment:
+  OLLAMA_NUM_PARALLEL  Files processed concurrently with --batch (default 4);
+                       set it to match the Ollama server's OLLAMA_NUM_PARALLEL
         """
     )
     
@@ -178,8 +216,8 @@ Examples:
     process_parser.add_argument('files', nargs='+', help='Invoice files to process')
     process_parser.add_argument(
         '--workflow', 
-        default=WorkflowType.STANDARD.value,
-        choices=[wf.value for wf in WorkflowType],
+        default="standard",
+        choices=WORKFLOW_CHOICES,
         help='Workflow type to use'
     )
     process_parser.add_argument(
@@ -3,13 +3,14 @@ Models module for invoice processing system
 """
 
 from .invoice_model import (
-    Invoice, InvoiceLineItem, Address, TaxDetail, ProcessingStatus
+    Invoice, InvoiceLineItem, LineItemBatch, Address, TaxDetail, ProcessingStatus
 )
 from .processing_result import ProcessingResult
 
 __all__ = [
     'Invoice',
     'InvoiceLineItem', 
+    'LineItemBatch',
     'Address',
     'TaxDetail',
     'ProcessingStatus',
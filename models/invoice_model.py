@@ -1,10 +1,13 @@
 """
 Data models for invoice processing
 """
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Any, Sequence
 from enum import Enum
 
+import numpy as np
+
 
 class ProcessingStatus(Enum):
     PENDING = "pending"
@@ -15,167 +18,218 @@ class ProcessingStatus(Enum):
     ERROR = "error"
 
 
+# Terminal outcomes, for set membership checks on processing_status
+SUCCESS_STATUSES = frozenset((ProcessingStatus.VALIDATED, ProcessingStatus.APPROVED))
+FAILURE_STATUSES = frozenset((ProcessingStatus.REJECTED, ProcessingStatus.ERROR))
+
+
+@dataclass(slots=True, frozen=True)
 class InvoiceLineItem:
     """Individual line item in an invoice"""
-    def __init__(self, description: str, quantity: float, unit_price: float, 
-                 total: float, tax_rate: Optional[float] = None, 
-                 tax_amount: Optional[float] = None):
-        self.description = description
-        self.quantity = quantity
-        self.unit_price = unit_price
-        self.total = total
-        self.tax_rate = tax_rate
-        self.tax_amount = tax_amount
-        
+    description: str
+    quantity: float
+    unit_price: float
+    total: float
+    tax_rate: Optional[float] = None
+    tax_amount: Optional[float] = None
+    
+    def __post_init__(self):
         # Validate total
-        expected_total = quantity * unit_price
-        if abs(total - expected_total) > 0.01:
-            raise ValueError(f"Total {total} doesn't match quantity * unit_price {expected_total}")
-
-
+        expected_total = self.quantity * self.unit_price
+        if abs(self.total - expected_total) > 0.01:
+            raise ValueError(f"Total {self.total} doesn't match quantity * unit_price {expected_total}")
+    
+    @classmethod
+    def trusted(cls, description: str, quantity: float, unit_price: float, total: float,
+                tax_rate: Optional[float] = None, tax_amount: Optional[float] = None) -> "InvoiceLineItem":
+        """Build a line item whose total was already checked, skipping __init__ and validation"""
+        item = object.__new__(cls)
+        set_description, set_quantity, set_unit_price, set_total, set_tax_rate, set_tax_amount = _LINE_ITEM_SETTERS
+        set_description(item, description)
+        set_quantity(item, quantity)
+        set_unit_price(item, unit_price)
+        set_total(item, total)
+        set_tax_rate(item, tax_rate)
+        set_tax_amount(item, tax_amount)
+        return item
+
+
+# Slot descriptors' setters write straight into the frozen instance's slots
+_LINE_ITEM_SETTERS = tuple(
+    InvoiceLineItem.__dict__[name].__set__
+    for name in ("description", "quantity", "unit_price", "total", "tax_rate", "tax_amount")
+)
+
+
+class LineItemBatch:
+    """Line items stored column-wise, so totals and checks are single NumPy operations"""
+    __slots__ = ("descriptions", "quantity", "unit_price", "total", "tax_rate")
+    
+    def __init__(self, descriptions: Sequence[str], quantity: np.ndarray, unit_price: np.ndarray,
+                 total: np.ndarray, tax_rate: Optional[np.ndarray] = None):
+        self.descriptions = list(descriptions)
+        self.quantity = np.asarray(quantity, dtype=np.float64)
+        self.unit_price = np.asarray(unit_price, dtype=np.float64)
+        self.total = np.asarray(total, dtype=np.float64)
+        # Missing tax rates are NaN
+        if tax_rate is None:
+            tax_rate = np.full(len(self.descriptions), np.nan)
+        self.tax_rate = np.asarray(tax_rate, dtype=np.float64)
+        
+        count = len(self.descriptions)
+        if not (len(self.quantity) == len(self.unit_price) == len(self.total) == len(self.tax_rate) == count):
+            raise ValueError("Line item columns must all have the same length")
+    
+    @classmethod
+    def from_line_items(cls, items: Sequence[InvoiceLineItem]) -> "LineItemBatch":
+        """Build the columns from line item objects; missing numbers become NaN"""
+        count = len(items)
+        
+        def column(attr: str) -> np.ndarray:
+            values = (getattr(item, attr) for item in items)
+            return np.fromiter((np.nan if value is None else value for value in values),
+                               dtype=np.float64, count=count)
+        
+        return cls(
+            [item.description for item in items],
+            column("quantity"),
+            column("unit_price"),
+            column("total"),
+            column("tax_rate")
+        )
+    
+    def __len__(self) -> int:
+        return len(self.descriptions)
+    
+    def subtotal(self) -> float:
+        """Sum of the item totals"""
+        return float(self.total.sum())
+    
+    def mismatched_rows(self, tolerance: float = 0.01) -> np.ndarray:
+        """Indices of items whose total differs from quantity * unit_price"""
+        return np.flatnonzero(np.abs(self.total - self.quantity * self.unit_price) > tolerance)
+    
+    def validate(self, tolerance: float = 0.01) -> bool:
+        """Check that every item total matches quantity * unit_price"""
+        return self.mismatched_rows(tolerance).size == 0
+    
+    def to_line_items(self) -> List[InvoiceLineItem]:
+        """Build line item objects from the columns, without re-validating them"""
+        tax_rates = [None if rate != rate else rate for rate in self.tax_rate.tolist()]
+        return [
+            InvoiceLineItem.trusted(description, quantity, unit_price, total, tax_rate)
+            for description, quantity, unit_price, total, tax_rate in zip(
+                self.descriptions, self.quantity.tolist(), self.unit_price.tolist(),
+                self.total.tolist(), tax_rates
+            )
+        ]
+
+
+@dataclass(slots=True, frozen=True)
 class Address:
     """Address information"""
-    def __init__(self, street: Optional[str] = None, city: Optional[str] = None,
-                 state: Optional[str] = None, postal_code: Optional[str] = None,
-                 country: Optional[str] = None):
-        self.street = street
-        self.city = city
-        self.state = state
-        self.postal_code = postal_code
-        self.country = country
+    street: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postal_code: Optional[str] = None
+    country: Optional[str] = None
+    # Addresses are immutable, so the display string is built once
+    _str: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        parts = (self.street, self.city, self.state, self.postal_code, self.country)
+        object.__setattr__(self, "_str", ", ".join(filter(None, parts)))
 
     def __str__(self):
-        parts = [self.street, self.city, self.state, self.postal_code, self.country]
-        return ", ".join([part for part in parts if part])
+        return self._str
 
 
+@dataclass(slots=True, frozen=True)
 class TaxDetail:
     """Tax details"""
-    def __init__(self, tax_type: str, tax_rate: float, taxable_amount: float, tax_amount: float):
-        self.tax_type = tax_type
-        self.tax_rate = tax_rate
-        self.taxable_amount = taxable_amount
-        self.tax_amount = tax_amount
+    tax_type: str
+    tax_rate: float
+    taxable_amount: float
+    tax_amount: float
 
 
+@dataclass(slots=True, eq=False)
 class Invoice:
     """Complete invoice data model"""
-    def __init__(self, invoice_number: str, date: datetime, vendor_name: str, buyer_name: str,
-                 line_items: List[InvoiceLineItem], currency: str, subtotal: float, 
-                 total_tax: float, total_amount: float, region: str,
-                 due_date: Optional[datetime] = None,
-                 vendor_address: Optional[Address] = None,
-                 vendor_tax_id: Optional[str] = None,
-                 vendor_email: Optional[str] = None,
-                 vendor_phone: Optional[str] = None,
-                 buyer_address: Optional[Address] = None,
-                 buyer_tax_id: Optional[str] = None,
-                 buyer_email: Optional[str] = None,
-                 buyer_phone: Optional[str] = None,
-                 tax_details: Optional[List[TaxDetail]] = None,
-                 discount_amount: Optional[float] = 0,
-                 processing_status: ProcessingStatus = ProcessingStatus.PENDING,
-                 confidence_score: Optional[float] = None,
-                 source_file: Optional[str] = None,
-                 processed_at: Optional[datetime] = None,
-                 processed_by: Optional[str] = None):
-        
-        # Basic Information
-        self.invoice_number = invoice_number
-        self.date = date
-        self.due_date = due_date
-        
-        # Vendor Information
-        self.vendor_name = vendor_name
-        self.vendor_address = vendor_address
-        self.vendor_tax_id = vendor_tax_id
-        self.vendor_email = vendor_email
-        self.vendor_phone = vendor_phone
-        
-        # Buyer Information
-        self.buyer_name = buyer_name
-        self.buyer_address = buyer_address
-        self.buyer_tax_id = buyer_tax_id
-        self.buyer_email = buyer_email
-        self.buyer_phone = buyer_phone
-        
-        # Line Items
+    # Basic Information
+    invoice_number: str
+    date: datetime
+    
+    # Vendor and buyer names
+    vendor_name: str
+    buyer_name: str
+    
+    # Line Items
+    line_items: List[InvoiceLineItem]
+    
+    # Financial Information
+    currency: str
+    subtotal: float
+    total_tax: float
+    total_amount: float
+    
+    # Processing Information
+    region: str
+    
+    due_date: Optional[datetime] = None
+    
+    # Vendor Information
+    vendor_address: Optional[Address] = None
+    vendor_tax_id: Optional[str] = None
+    vendor_email: Optional[str] = None
+    vendor_phone: Optional[str] = None
+    
+    # Buyer Information
+    buyer_address: Optional[Address] = None
+    buyer_tax_id: Optional[str] = None
+    buyer_email: Optional[str] = None
+    buyer_phone: Optional[str] = None
+    
+    tax_details: Optional[List[TaxDetail]] = None
+    discount_amount: Optional[float] = 0
+    processing_status: ProcessingStatus = ProcessingStatus.PENDING
+    confidence_score: Optional[float] = None
+    
+    # Metadata
+    source_file: Optional[str] = None
+    processed_at: Optional[datetime] = None
+    processed_by: Optional[str] = None
+    
+    # Optional columnar copy of line_items, used for bulk checks when present
+    line_items_batch: Optional[LineItemBatch] = None
+    
+    def __post_init__(self):
+        line_items = self.line_items
         self.line_items = line_items or []
+        self.tax_details = self.tax_details or []
+        self.discount_amount = self.discount_amount or 0
         
-        # Financial Information
-        self.currency = currency
-        self.subtotal = subtotal
-        self.tax_details = tax_details or []
-        self.total_tax = total_tax
-        self.discount_amount = discount_amount or 0
-        self.total_amount = total_amount
-        
-        # Processing Information
-        self.region = region
-        self.processing_status = processing_status
-        self.confidence_score = confidence_score
+        # Validate totals; a columnar copy of the items sums in one pass
+        if line_items:
+            batch = self.line_items_batch
+            items_total = batch.subtotal() if batch is not None else sum(item.total for item in line_items)
+            if abs(items_total - self.subtotal) > 0.01:
+                raise ValueError(f"Line items total {items_total} doesn't match subtotal {self.subtotal}")
         
-        # Metadata
-        self.source_file = source_file
-        self.processed_at = processed_at
-        self.processed_by = processed_by
+        expected_total = self.subtotal + self.total_tax - self.discount_amount
+        if abs(self.total_amount - expected_total) > 0.01:
+            raise ValueError(f"Total amount {self.total_amount} doesn't match calculated total {expected_total}")
+    
+    @classmethod
+    def from_arrays(cls, descriptions: Sequence[str], quantity: np.ndarray, unit_price: np.ndarray,
+                    total: np.ndarray, **invoice_fields: Any) -> "Invoice":
+        """Create an invoice from line item columns, validating every item total in one pass"""
+        batch = LineItemBatch(descriptions, quantity, unit_price, total)
         
-        # Validate totals
-        if line_items:
-            items_total = sum(item.total for item in line_items)
-            if abs(items_total - subtotal) > 0.01:
-                raise ValueError(f"Line items total {items_total} doesn't match subtotal {subtotal}")
+        mismatched = batch.mismatched_rows()
+        if mismatched.size:
+            row = mismatched[0]
+            expected = batch.quantity[row] * batch.unit_price[row]
+            raise ValueError(f"Total {batch.total[row]} doesn't match quantity * unit_price {expected}")
         
-        expected_total = subtotal + total_tax - self.discount_amount
-        if abs(total_amount - expected_total) > 0.01:
-            raise ValueError(f"Total amount {total_amount} doesn't match calculated total {expected_total}")
-
-
-class ProcessingResult:
-    """Result of invoice processing"""
-    def __init__(self):
-        self.invoice: Optional[Invoice] = None
-        self.status: ProcessingStatus = ProcessingStatus.PENDING
-        self.confidence_score: float = 0.0
-        self.errors: List[str] = []
-        self.warnings: List[str] = []
-        self.processing_steps: List[Dict[str, Any]] = []
-        self.processing_time: Optional[float] = None
-
-    def add_error(self, error: str):
-        """Add an error to the result"""
-        self.errors.append(error)
-        if self.status != ProcessingStatus.ERROR:
-            self.status = ProcessingStatus.ERROR
-
-    def add_warning(self, warning: str):
-        """Add a warning to the result"""
-        self.warnings.append(warning)
-
-    def add_processing_step(self, agent: str, action: str, result: str, confidence: float = None):
-        """Add a processing step"""
-        step = {
-            "agent": agent,
-            "action": action,
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        if confidence is not None:
-            step["confidence"] = confidence
-        self.processing_steps.append(step)
-
-    def is_successful(self) -> bool:
-        """Check if processing was successful"""
-        return self.status in [ProcessingStatus.VALIDATED, ProcessingStatus.APPROVED] and not self.errors
-
-    def get_summary(self) -> Dict[str, Any]:
-        """Get a summary of the processing result"""
-        return {
-            "status": self.status.value,
-            "confidence_score": self.confidence_score,
-            "error_count": len(self.errors),
-            "warning_count": len(self.warnings),
-            "processing_steps": len(self.processing_steps),
-            "has_invoice": self.invoice is not None,
-            "processing_time": self.processing_time
-        }
\ No newline at end of file
+        return cls(line_items=batch.to_line_items(), line_items_batch=batch, **invoice_fields)
@@ -1,20 +1,26 @@
 """
 Processing Result Models - Simple and consistent interface for agent results
 """
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 
+@dataclass(slots=True, eq=False)
 class ProcessingResult:
     """Simple processing result used by all agents"""
+    confidence_score: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    processing_steps: List[Dict[str, Any]] = field(default_factory=list)
+    processing_time: Optional[float] = None
+    
+    @classmethod
+    def from_error(cls, error: str) -> "ProcessingResult":
+        """Create a failed result carrying a single error"""
+        return cls(errors=[error])
     
-    def __init__(self):
-        self.confidence_score: float = 0.0
-        self.errors: List[str] = []
-        self.warnings: List[str] = []
-        self.processing_steps: List[Dict[str, Any]] = []
-        self.processing_time: Optional[float] = None
-        
     def add_error(self, error: str) -> None:
         """Add an error message"""
         self.errors.append(error)
@@ -23,13 +29,22 @@ class ProcessingResult:
         """Add a warning message"""
         self.warnings.append(warning)
     
+    def extend_errors(self, errors: List[str]) -> None:
+        """Add several error messages at once"""
+        self.errors.extend(errors)
+    
+    def extend_warnings(self, warnings: List[str]) -> None:
+        """Add several warning messages at once"""
+        self.warnings.extend(warnings)
+    
     def add_processing_step(self, agent: str, action: str, result: str, confidence: Optional[float] = None) -> None:
         """Add a processing step"""
         step = {
             "agent": agent,
             "action": action,
             "result": result,
-            "timestamp": datetime.now().isoformat()
+            # Epoch nanoseconds; to_dict formats them only when exporting
+            "timestamp": time.time_ns()
         }
         if confidence is not None:
             step["confidence"] = confidence
@@ -48,4 +63,17 @@ class ProcessingResult:
             "processing_steps": len(self.processing_steps),
             "successful": self.is_successful(),
             "processing_time": self.processing_time
-        }
\ No newline at end of file
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Export the result as JSON-ready data, with step timestamps as ISO strings"""
+        return {
+            "confidence_score": self.confidence_score,
+            "errors": list(self.errors),
+            "warnings": list(self.warnings),
+            "processing_steps": [
+                {**step, "timestamp": datetime.fromtimestamp(step["timestamp"] / 1e9).isoformat()}
+                for step in self.processing_steps
+            ],
+            "processing_time": self.processing_time
+        }
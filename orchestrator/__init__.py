@@ -5,7 +5,6 @@ This module provides orchestration capabilities for coordinating the execution
 of multiple agents in various workflow configurations.
 """
 
-from .agent_coordinator import AgentCoordinator
 from .workflow_manager import WorkflowManager, WorkflowType, WorkflowStep
 
 __all__ = [
@@ -13,4 +12,12 @@ __all__ = [
     'WorkflowManager', 
     'WorkflowType',
     'WorkflowStep'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # AgentCoordinator imports every agent, so load it only when it is asked for
+    if name == "AgentCoordinator":
+        from .agent_coordinator import AgentCoordinator
+        return AgentCoordinator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,17 @@
 """
 Agent Coordinator - Manages the instantiation, execution, and coordination of all agents
 """
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
 from agents.document_parser_agent import DocumentParserAgent
-from agents.data_extraction_agent import DataExtractionAgent
+from agents.data_extraction_agent import DataExtractionAgent, INVOICE_EXTRACTION_SCHEMA
 from agents.validation_agent import ValidationAgent
 from agents.regional_compliance_agent import RegionalComplianceAgent
 from agents.approval_agent import ApprovalAgent
@@ -15,9 +19,31 @@ from agents.audit_agent import AuditAgent
 from models.processing_result import ProcessingResult
 from models.invoice_model import Invoice, ProcessingStatus
 from utils.ollama_client import OllamaClient
+from utils.profiler import Profiler
 from config.settings import settings
 
 
+# Pipeline agents by name, in pipeline order
+AGENT_CLASSES = {
+    "document_parser": DocumentParserAgent,
+    "data_extraction": DataExtractionAgent,
+    "validation": ValidationAgent,
+    "regional_compliance": RegionalComplianceAgent,
+    "approval": ApprovalAgent,
+    "audit": AuditAgent
+}
+
+# Agents whose failure fails the whole pipeline
+CRITICAL_AGENTS = ("document_parser", "data_extraction")
+
+# Invoice statuses that settle the pipeline's final status on their own
+FINAL_STATUS_BY_INVOICE_STATUS = {
+    ProcessingStatus.APPROVED: "approved",
+    ProcessingStatus.REJECTED: "rejected",
+    ProcessingStatus.ERROR: "failed"
+}
+
+
 class AgentCoordinator:
     """Coordinates the execution of all agents in the invoice processing pipeline"""
     
@@ -36,22 +62,29 @@ class AgentCoordinator:
             "successful": 0,
             "failed": 0,
             "pending_review": 0,
+            "total_time": 0.0,
             "average_processing_time": 0.0
         }
+        # Batches can run pipelines on several threads at once
+        self._stats_lock = threading.Lock()
+        
+        # Per-agent latency, to find the stage worth optimizing next
+        self.profiler = Profiler()
         
         self.logger.info("Agent coordinator initialized with agents: %s", list(self.agents.keys()))
     
+    def warmup(self) -> bool:
+        """Load the LLM and render the extraction prompt before the first invoice arrives"""
+        self.ollama_client.compile_extractor(INVOICE_EXTRACTION_SCHEMA)
+        loaded = self.ollama_client.load_model()
+        if loaded:
+            self.logger.info(f"Warmed up model {self.ollama_client.model}")
+        return loaded
+    
     def _initialize_agents(self) -> Dict[str, Any]:
         """Initialize all processing agents"""
-        agents = {}
-        
         try:
-            agents["document_parser"] = DocumentParserAgent(self.ollama_client)
-            agents["data_extraction"] = DataExtractionAgent(self.ollama_client)
-            agents["validation"] = ValidationAgent(self.ollama_client)
-            agents["regional_compliance"] = RegionalComplianceAgent(self.ollama_client)
-            agents["approval"] = ApprovalAgent(self.ollama_client)
-            agents["audit"] = AuditAgent(self.ollama_client)
+            agents = {name: agent_class(self.ollama_client) for name, agent_class in AGENT_CLASSES.items()}
             
             self.logger.info("All agents initialized successfully")
             
@@ -73,6 +106,7 @@ class AgentCoordinator:
             Dict containing processing results and final invoice
         """
         start_time = datetime.now()
+        started = time.monotonic()
         session_id = session_id or f"session_{start_time.strftime('%Y%m%d_%H%M%S')}"
         
         # Initialize processing context
@@ -94,6 +128,7 @@ class AgentCoordinator:
             "confidence_score": 0.0
         }
         
+        pipeline_completed = False
         try:
             self.logger.info(f"Starting invoice processing pipeline for session {session_id}")
             
@@ -104,8 +139,8 @@ class AgentCoordinator:
             if parser_result.errors:
                 raise Exception(f"Document parsing failed: {parser_result.errors}")
             
-            # Step 2: Data Extraction
-            extraction_result = self._execute_agent("data_extraction", input_data, context)
+            # Step 2: Data Extraction, from the parser's text rather than the raw input again
+            extraction_result = self._execute_agent("data_extraction", context.get("raw_text"), context)
             pipeline_result["results"]["data_extraction"] = extraction_result
             
             if extraction_result.errors:
@@ -137,23 +172,25 @@ class AgentCoordinator:
             pipeline_result["status"] = self._determine_final_status(pipeline_result["results"], final_invoice)
             
             # Collect all errors and warnings
-            pipeline_result["errors"] = self._collect_errors(pipeline_result["results"])
-            pipeline_result["warnings"] = self._collect_warnings(pipeline_result["results"])
+            pipeline_result["errors"], pipeline_result["warnings"] = self._collect_diagnostics(pipeline_result["results"])
             
-            # Update statistics
-            self._update_statistics(pipeline_result)
+            pipeline_completed = True
             
         except Exception as e:
             self.logger.error(f"Pipeline processing failed for session {session_id}: {e}")
             pipeline_result["status"] = "failed"
             pipeline_result["errors"].append(str(e))
-            self.processing_stats["failed"] += 1
+            with self._stats_lock:
+                self.processing_stats["failed"] += 1
         
         finally:
-            # Calculate total processing time
-            end_time = datetime.now()
-            pipeline_result["processing_time"] = (end_time - start_time).total_seconds()
-            context["end_time"] = end_time
+            # Calculate total processing time on the monotonic clock, immune to wall-clock jumps
+            pipeline_result["processing_time"] = time.monotonic() - started
+            context["end_time"] = datetime.now()
+            
+            # Only once the time is known, so it counts towards the average
+            if pipeline_completed:
+                self._update_statistics(pipeline_result)
             
             self.logger.info(f"Pipeline processing completed for session {session_id} in {pipeline_result['processing_time']:.2f}s")
         
@@ -165,11 +202,13 @@ class AgentCoordinator:
         if not agent:
             raise ValueError(f"Agent {agent_name} not found")
         
+        started = time.perf_counter()
         try:
             self.logger.debug(f"Executing agent: {agent_name}")
             
             # Execute the agent
             result = agent.execute(input_data, context)
+            self.profiler.record(f"agent.{agent_name}", time.perf_counter() - started, ok=not result.errors)
             
             # Store agent-specific results in context
             context[f"{agent_name}_result"] = result
@@ -180,31 +219,24 @@ class AgentCoordinator:
             
         except Exception as e:
             self.logger.error(f"Agent {agent_name} execution failed: {e}")
+            self.profiler.record(f"agent.{agent_name}", time.perf_counter() - started, ok=False)
             
-            # Create error result
-            error_result = ProcessingResult()
-            error_result.add_error(f"Agent {agent_name} failed: {str(e)}")
-            
-            return error_result
+            return ProcessingResult.from_error(f"Agent {agent_name} failed: {str(e)}")
     
     def _determine_final_status(self, results: Dict[str, ProcessingResult], invoice: Optional[Invoice]) -> str:
         """Determine the final processing status based on all agent results"""
         
         # Check if any critical agents failed
-        critical_agents = ["document_parser", "data_extraction"]
-        for agent_name in critical_agents:
+        for agent_name in CRITICAL_AGENTS:
             result = results.get(agent_name)
             if result and result.errors:
                 return "failed"
         
         # Check invoice processing status
-        if invoice and invoice.processing_status:
-            if invoice.processing_status == ProcessingStatus.APPROVED:
-                return "approved"
-            elif invoice.processing_status == ProcessingStatus.REJECTED:
-                return "rejected"
-            elif invoice.processing_status == ProcessingStatus.ERROR:
-                return "failed"
+        if invoice:
+            final_status = FINAL_STATUS_BY_INVOICE_STATUS.get(invoice.processing_status)
+            if final_status:
+                return final_status
         
         # Check if manual review is required
         approval_result = results.get("approval")
@@ -214,63 +246,107 @@ class AgentCoordinator:
         # Default to completed if no specific status
         return "completed"
     
-    def _collect_errors(self, results: Dict[str, ProcessingResult]) -> List[str]:
-        """Collect all errors from agent results"""
+    def _collect_diagnostics(self, results: Dict[str, ProcessingResult]) -> Tuple[List[str], List[str]]:
+        """Collect all errors and warnings from agent results in one pass"""
         all_errors = []
-        
-        for agent_name, result in results.items():
-            if result and result.errors:
-                for error in result.errors:
-                    all_errors.append(f"{agent_name}: {error}")
-        
-        return all_errors
-    
-    def _collect_warnings(self, results: Dict[str, ProcessingResult]) -> List[str]:
-        """Collect all warnings from agent results"""
         all_warnings = []
         
         for agent_name, result in results.items():
-            if result and result.warnings:
-                for warning in result.warnings:
-                    all_warnings.append(f"{agent_name}: {warning}")
+            if not result:
+                continue
+            all_errors.extend(f"{agent_name}: {error}" for error in result.errors)
+            all_warnings.extend(f"{agent_name}: {warning}" for warning in result.warnings)
         
-        return all_warnings
+        return all_errors, all_warnings
     
     def _update_statistics(self, pipeline_result: Dict[str, Any]) -> None:
         """Update processing statistics"""
-        self.processing_stats["total_processed"] += 1
-        
-        status = pipeline_result["status"]
-        if status == "approved":
-            self.processing_stats["successful"] += 1
-        elif status == "failed":
-            self.processing_stats["failed"] += 1
-        elif status == "pending_review":
-            self.processing_stats["pending_review"] += 1
-        
-        # Update average processing time
-        total_time = self.processing_stats.get("total_time", 0.0)
-        total_time += pipeline_result["processing_time"]
-        self.processing_stats["total_time"] = total_time
-        self.processing_stats["average_processing_time"] = (
-            total_time / self.processing_stats["total_processed"]
-        )
+        with self._stats_lock:
+            self.processing_stats["total_processed"] += 1
+            
+            status = pipeline_result["status"]
+            if status == "approved":
+                self.processing_stats["successful"] += 1
+            elif status == "failed":
+                self.processing_stats["failed"] += 1
+            elif status == "pending_review":
+                self.processing_stats["pending_review"] += 1
+            
+            # Update average processing time
+            self.processing_stats["total_time"] += pipeline_result["processing_time"]
+            self.processing_stats["average_processing_time"] = (
+                self.processing_stats["total_time"] / self.processing_stats["total_processed"]
+            )
+    
+    def process_batch(self, input_files: List[Union[str, Path]], batch_id: Optional[str] = None,
+                      max_parallel: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process multiple invoices in batch on a pool of worker threads
+        
+        Args:
+            input_files: List of file paths to process
+            batch_id: Optional batch identifier
+            max_parallel: Pipelines to run at once (defaults to OLLAMA_NUM_PARALLEL)
+            
+        Returns:
+            Dict containing batch processing results, in input order
+        """
+        started = time.monotonic()
+        batch_result = self._start_batch(input_files, batch_id)
+        
+        def process_item(i: int, input_file: Union[str, Path]) -> Union[Dict[str, Any], Exception]:
+            try:
+                return self.process_invoice(input_file, f"{batch_result['batch_id']}_item_{i+1}")
+            except Exception as e:
+                return e
+        
+        max_workers = max(1, min(max_parallel or settings.OLLAMA_NUM_PARALLEL, len(input_files)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+            outcomes = list(executor.map(process_item, range(len(input_files)), input_files))
+        
+        for input_file, outcome in zip(input_files, outcomes):
+            self._record_batch_item(batch_result, input_file, outcome)
+        
+        return self._finish_batch(batch_result, started)
     
-    def process_batch(self, input_files: List[Union[str, Path]], batch_id: Optional[str] = None) -> Dict[str, Any]:
+    async def process_batch_async(self, input_files: List[Union[str, Path]], batch_id: Optional[str] = None,
+                                  max_parallel: Optional[int] = None) -> Dict[str, Any]:
         """
-        Process multiple invoices in batch
+        Process multiple invoices concurrently so their Ollama calls overlap
         
         Args:
             input_files: List of file paths to process
             batch_id: Optional batch identifier
+            max_parallel: Pipelines to run at once (defaults to OLLAMA_NUM_PARALLEL)
             
         Returns:
-            Dict containing batch processing results
+            Dict containing batch processing results, in input order
         """
+        started = time.monotonic()
+        batch_result = self._start_batch(input_files, batch_id)
+        semaphore = asyncio.Semaphore(max_parallel or settings.OLLAMA_NUM_PARALLEL)
+        
+        async def process_item(i: int, input_file: Union[str, Path]) -> Dict[str, Any]:
+            session_id = f"{batch_result['batch_id']}_item_{i+1}"
+            async with semaphore:
+                return await asyncio.to_thread(self.process_invoice, input_file, session_id)
+        
+        outcomes = await asyncio.gather(
+            *(process_item(i, input_file) for i, input_file in enumerate(input_files)),
+            return_exceptions=True
+        )
+        for input_file, outcome in zip(input_files, outcomes):
+            self._record_batch_item(batch_result, input_file, outcome)
+        
+        return self._finish_batch(batch_result, started)
+    
+    def _start_batch(self, input_files: List[Union[str, Path]], batch_id: Optional[str]) -> Dict[str, Any]:
+        """Create an empty batch result"""
         start_time = datetime.now()
         batch_id = batch_id or f"batch_{start_time.strftime('%Y%m%d_%H%M%S')}"
+        self.logger.info(f"Starting batch processing {batch_id} with {len(input_files)} files")
         
-        batch_result = {
+        return {
             "batch_id": batch_id,
             "total_files": len(input_files),
             "processed": 0,
@@ -281,39 +357,37 @@ class AgentCoordinator:
             "processing_time": 0.0,
             "start_time": start_time.isoformat()
         }
+    
+    def _record_batch_item(self, batch_result: Dict[str, Any], input_file: Union[str, Path],
+                           result: Union[Dict[str, Any], BaseException]) -> None:
+        """Add one file's pipeline result (or the exception it raised) to a batch result"""
+        if isinstance(result, BaseException):
+            self.logger.error(f"Failed to process file {input_file}: {result}")
+            batch_result["failed"] += 1
+            batch_result["results"].append({
+                "file": str(input_file),
+                "status": "failed",
+                "error": str(result)
+            })
+            return
+        
+        batch_result["results"].append(result)
+        batch_result["processed"] += 1
+        
+        # Update batch statistics
+        if result["status"] == "approved":
+            batch_result["successful"] += 1
+        elif result["status"] == "failed":
+            batch_result["failed"] += 1
+        elif result["status"] == "pending_review":
+            batch_result["pending_review"] += 1
+    
+    def _finish_batch(self, batch_result: Dict[str, Any], started: float) -> Dict[str, Any]:
+        """Stamp a batch result with its end time and its duration since the monotonic reading started"""
+        batch_result["processing_time"] = time.monotonic() - started
+        batch_result["end_time"] = datetime.now().isoformat()
         
-        self.logger.info(f"Starting batch processing {batch_id} with {len(input_files)} files")
-        
-        for i, input_file in enumerate(input_files):
-            try:
-                session_id = f"{batch_id}_item_{i+1}"
-                result = self.process_invoice(input_file, session_id)
-                batch_result["results"].append(result)
-                batch_result["processed"] += 1
-                
-                # Update batch statistics
-                if result["status"] == "approved":
-                    batch_result["successful"] += 1
-                elif result["status"] == "failed":
-                    batch_result["failed"] += 1
-                elif result["status"] == "pending_review":
-                    batch_result["pending_review"] += 1
-                
-            except Exception as e:
-                self.logger.error(f"Failed to process file {input_file}: {e}")
-                batch_result["failed"] += 1
-                batch_result["results"].append({
-                    "file": str(input_file),
-                    "status": "failed",
-                    "error": str(e)
-                })
-        
-        # Finalize batch results
-        end_time = datetime.now()
-        batch_result["processing_time"] = (end_time - start_time).total_seconds()
-        batch_result["end_time"] = end_time.isoformat()
-        
-        self.logger.info(f"Batch processing {batch_id} completed: {batch_result['successful']}/{batch_result['total_files']} successful")
+        self.logger.info(f"Batch processing {batch_result['batch_id']} completed: {batch_result['successful']}/{batch_result['total_files']} successful")
         
         return batch_result
     
@@ -343,9 +417,12 @@ class AgentCoordinator:
     
     def get_processing_statistics(self) -> Dict[str, Any]:
         """Get overall processing statistics"""
+        with self._stats_lock:
+            coordinator_stats = self.processing_stats.copy()
         return {
-            "coordinator_stats": self.processing_stats.copy(),
+            "coordinator_stats": coordinator_stats,
             "agent_stats": {name: agent.get_stats() for name, agent in self.agents.items()},
+            "agent_latency": self.profiler.report(),
             "system_health": self.get_system_health()
         }
     
@@ -370,25 +447,24 @@ class AgentCoordinator:
     
     def _check_ollama_health(self) -> bool:
         """Check if Ollama is healthy and responsive"""
-        try:
-            response = self.ollama_client.generate("test", model=settings.OLLAMA_MODEL)
-            return bool(response)
-        except Exception:
-            return False
+        return self.ollama_client.ping()
     
     def reset_statistics(self) -> None:
         """Reset all processing statistics"""
-        self.processing_stats = {
-            "total_processed": 0,
-            "successful": 0,
-            "failed": 0,
-            "pending_review": 0,
-            "average_processing_time": 0.0
-        }
+        with self._stats_lock:
+            self.processing_stats = {
+                "total_processed": 0,
+                "successful": 0,
+                "failed": 0,
+                "pending_review": 0,
+                "total_time": 0.0,
+                "average_processing_time": 0.0
+            }
         
         # Reset agent statistics
         for agent in self.agents.values():
             agent.reset_stats()
+        self.profiler.reset()
         
         self.logger.info("Processing statistics reset")
     
@@ -399,18 +475,7 @@ class AgentCoordinator:
                 return False
             
             # Reinitialize the agent
-            if agent_name == "document_parser":
-                self.agents[agent_name] = DocumentParserAgent(self.ollama_client)
-            elif agent_name == "data_extraction":
-                self.agents[agent_name] = DataExtractionAgent(self.ollama_client)
-            elif agent_name == "validation":
-                self.agents[agent_name] = ValidationAgent(self.ollama_client)
-            elif agent_name == "regional_compliance":
-                self.agents[agent_name] = RegionalComplianceAgent(self.ollama_client)
-            elif agent_name == "approval":
-                self.agents[agent_name] = ApprovalAgent(self.ollama_client)
-            elif agent_name == "audit":
-                self.agents[agent_name] = AuditAgent(self.ollama_client)
+            self.agents[agent_name] = AGENT_CLASSES[agent_name](self.ollama_client)
             
             self.logger.info(f"Agent {agent_name} restarted successfully")
             return True
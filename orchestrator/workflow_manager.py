@@ -2,16 +2,31 @@
 Workflow Manager - Manages different processing workflows and pipeline configurations
 """
 import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Callable, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Callable, Tuple, Union
 from enum import Enum
 from pathlib import Path
 
-from orchestrator.agent_coordinator import AgentCoordinator
 from models.processing_result import ProcessingResult
 from models.invoice_model import Invoice, ProcessingStatus
 from config.settings import settings
 
+if TYPE_CHECKING:
+    # Importing the coordinator loads every agent; defer that until one is needed
+    from orchestrator.agent_coordinator import AgentCoordinator
+
+
+# Most recent executions kept in the history
+MAX_EXECUTION_HISTORY = 1000
+
+# Workflow statuses counted as successful executions
+SUCCESSFUL_WORKFLOW_STATUSES = frozenset(("approved", "completed"))
+
 
 class WorkflowType(Enum):
     """Available workflow types"""
@@ -25,6 +40,8 @@ class WorkflowType(Enum):
 class WorkflowStep:
     """Represents a single step in a workflow"""
     
+    __slots__ = ("agent_name", "required", "condition", "skip_reason")
+    
     def __init__(self, agent_name: str, required: bool = True, condition: Optional[Callable] = None):
         self.agent_name = agent_name
         self.required = required
@@ -41,18 +58,38 @@ class WorkflowStep:
 class WorkflowManager:
     """Manages different processing workflows and their execution"""
     
-    def __init__(self, agent_coordinator: Optional[AgentCoordinator] = None):
+    def __init__(self, agent_coordinator: Optional["AgentCoordinator"] = None):
         self.logger = logging.getLogger(__name__)
-        self.agent_coordinator = agent_coordinator or AgentCoordinator()
+        self._agent_coordinator = agent_coordinator
+        self._coordinator_lock = threading.Lock()
         
         # Define available workflows
         self.workflows = self._define_workflows()
         
-        # Workflow execution history
-        self.execution_history = []
+        # Workflow execution history; the oldest entry drops off once it is full
+        self.execution_history = deque(maxlen=MAX_EXECUTION_HISTORY)
+        
+        # Running totals over execution_history, kept in step with it so statistics need no scan
+        self._history_lock = threading.Lock()
+        self._history_totals = {
+            "by_workflow_type": Counter(),
+            "by_status": Counter(),
+            "total_time": 0.0,
+            "successful": 0
+        }
         
         self.logger.info("Workflow manager initialized with workflows: %s", list(self.workflows.keys()))
     
+    @property
+    def agent_coordinator(self) -> "AgentCoordinator":
+        """The coordinator whose agents run the steps, created on first use if none was given"""
+        if self._agent_coordinator is None:
+            with self._coordinator_lock:
+                if self._agent_coordinator is None:
+                    from orchestrator.agent_coordinator import AgentCoordinator
+                    self._agent_coordinator = AgentCoordinator()
+        return self._agent_coordinator
+    
     def _define_workflows(self) -> Dict[str, List[WorkflowStep]]:
         """Define all available workflows"""
         workflows = {}
@@ -123,6 +160,7 @@ class WorkflowManager:
             Dict containing workflow execution results
         """
         start_time = datetime.now()
+        started = time.monotonic()
         
         # Convert enum to string if needed
         if isinstance(workflow_type, WorkflowType):
@@ -189,7 +227,11 @@ class WorkflowManager:
                     step_input = self._determine_step_input(step.agent_name, input_data, context)
                     
                     # Execute the agent
+                    step_started = time.perf_counter()
                     result = agent.execute(step_input, context)
+                    self.agent_coordinator.profiler.record(
+                        f"agent.{step.agent_name}", time.perf_counter() - step_started, ok=not result.errors
+                    )
                     
                     # Store result
                     workflow_result["results"][step.agent_name] = result
@@ -228,8 +270,9 @@ class WorkflowManager:
             workflow_result["status"] = self._determine_workflow_status(workflow_result, final_invoice)
             
             # Collect all errors and warnings
-            workflow_result["errors"].extend(self._collect_workflow_errors(workflow_result["results"]))
-            workflow_result["warnings"].extend(self._collect_workflow_warnings(workflow_result["results"]))
+            step_errors, step_warnings = self._collect_workflow_diagnostics(workflow_result["results"])
+            workflow_result["errors"].extend(step_errors)
+            workflow_result["warnings"].extend(step_warnings)
             
             self.logger.info(f"Workflow {workflow_type} completed successfully for session {session_id}")
             
@@ -239,25 +282,58 @@ class WorkflowManager:
             workflow_result["errors"].append(str(e))
         
         finally:
-            # Calculate total processing time
-            end_time = datetime.now()
-            workflow_result["processing_time"] = (end_time - start_time).total_seconds()
-            context["end_time"] = end_time
+            # Calculate total processing time on the monotonic clock, immune to wall-clock jumps
+            workflow_result["processing_time"] = time.monotonic() - started
+            context["end_time"] = datetime.now()
             
             # Store execution history
             self._store_execution_history(workflow_result, context)
         
         return workflow_result
     
+    def execute_workflow_batch(self,
+                               workflow_type: Union[WorkflowType, str],
+                               inputs: List[Union[str, Path, bytes]],
+                               workflow_config: Optional[Dict[str, Any]] = None,
+                               max_parallel: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Execute one workflow over several inputs concurrently
+        
+        Args:
+            workflow_type: Type of workflow to execute
+            inputs: Input data items to process
+            workflow_config: Optional workflow configuration overrides, shared by all items
+            max_parallel: Workflows to run at once (defaults to OLLAMA_NUM_PARALLEL)
+            
+        Returns:
+            List of workflow results, in input order
+        """
+        if isinstance(workflow_type, WorkflowType):
+            workflow_type = workflow_type.value
+        if workflow_type not in self.workflows:
+            raise ValueError(f"Unknown workflow type: {workflow_type}")
+        if not inputs:
+            return []
+        
+        batch_id = f"workflow_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        def execute_item(i: int, input_data: Union[str, Path, bytes]) -> Dict[str, Any]:
+            return self.execute_workflow(workflow_type, input_data, f"{batch_id}_item_{i+1}", workflow_config)
+        
+        # Ollama batches concurrent requests server-side, so keep enough in flight to fill its slots
+        max_workers = max(1, min(max_parallel or settings.OLLAMA_NUM_PARALLEL, len(inputs)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow") as executor:
+            return list(executor.map(execute_item, range(len(inputs)), inputs))
+    
     def _determine_step_input(self, agent_name: str, original_input: Any, context: Dict[str, Any]) -> Any:
         """Determine the appropriate input for each agent step"""
         # First agent gets the original input
         if agent_name == "document_parser":
             return original_input
         
-        # Subsequent agents typically work with processed data
-        if agent_name in ["data_extraction"]:
-            return original_input  # Data extraction needs the original input too
+        # Data extraction works on the parser's text; the original input may be a file path or bytes
+        if agent_name == "data_extraction":
+            return context.get("raw_text", original_input)
         
         # Validation and later agents work with the extracted invoice
         return context.get("invoice", original_input)
@@ -286,23 +362,16 @@ class WorkflowManager:
         
         return "completed"
     
-    def _collect_workflow_errors(self, results: Dict[str, ProcessingResult]) -> List[str]:
-        """Collect all errors from workflow results"""
+    def _collect_workflow_diagnostics(self, results: Dict[str, ProcessingResult]) -> Tuple[List[str], List[str]]:
+        """Collect all errors and warnings from workflow results in one pass"""
         all_errors = []
-        for agent_name, result in results.items():
-            if result and hasattr(result, 'errors') and result.errors:
-                for error in result.errors:
-                    all_errors.append(f"{agent_name}: {error}")
-        return all_errors
-    
-    def _collect_workflow_warnings(self, results: Dict[str, ProcessingResult]) -> List[str]:
-        """Collect all warnings from workflow results"""
         all_warnings = []
         for agent_name, result in results.items():
-            if result and hasattr(result, 'warnings') and result.warnings:
-                for warning in result.warnings:
-                    all_warnings.append(f"{agent_name}: {warning}")
-        return all_warnings
+            if not result:
+                continue
+            all_errors.extend(f"{agent_name}: {error}" for error in result.errors)
+            all_warnings.extend(f"{agent_name}: {warning}" for warning in result.warnings)
+        return all_errors, all_warnings
     
     def _store_execution_history(self, workflow_result: Dict[str, Any], context: Dict[str, Any]) -> None:
         """Store workflow execution in history"""
@@ -318,11 +387,25 @@ class WorkflowManager:
             "timestamp": context["start_time"].isoformat()
         }
         
-        self.execution_history.append(history_entry)
-        
-        # Keep only recent history (last 1000 executions)
-        if len(self.execution_history) > 1000:
-            self.execution_history = self.execution_history[-1000:]
+        with self._history_lock:
+            # A full deque evicts its oldest entry on append, so take it out of the totals first
+            if len(self.execution_history) == self.execution_history.maxlen:
+                self._count_history_entry(self.execution_history[0], -1)
+            self.execution_history.append(history_entry)
+            self._count_history_entry(history_entry, 1)
+    
+    def _count_history_entry(self, entry: Dict[str, Any], sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a history entry from the running totals"""
+        totals = self._history_totals
+        for counter, key in ((totals["by_workflow_type"], entry["workflow_type"]),
+                             (totals["by_status"], entry["status"])):
+            counter[key] += sign
+            if not counter[key]:
+                del counter[key]
+        
+        totals["total_time"] += sign * entry["processing_time"]
+        if entry["status"] in SUCCESSFUL_WORKFLOW_STATUSES:
+            totals["successful"] += sign
     
     def create_custom_workflow(self, name: str, steps: List[Dict[str, Any]]) -> bool:
         """
@@ -380,45 +463,25 @@ class WorkflowManager:
     
     def get_execution_history(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent workflow execution history"""
-        return self.execution_history[-limit:] if self.execution_history else []
+        history = self.execution_history
+        start = len(history) - limit if 0 < limit < len(history) else 0
+        return list(islice(history, start, None))
     
     def get_workflow_statistics(self) -> Dict[str, Any]:
         """Get statistics about workflow executions"""
-        if not self.execution_history:
-            return {"total_executions": 0}
-        
-        stats = {
-            "total_executions": len(self.execution_history),
-            "by_workflow_type": {},
-            "by_status": {},
-            "average_processing_time": 0.0,
-            "success_rate": 0.0
-        }
-        
-        total_time = 0.0
-        successful = 0
-        
-        for entry in self.execution_history:
-            # Count by workflow type
-            workflow_type = entry["workflow_type"]
-            stats["by_workflow_type"][workflow_type] = stats["by_workflow_type"].get(workflow_type, 0) + 1
-            
-            # Count by status
-            status = entry["status"]
-            stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
+        with self._history_lock:
+            total_executions = len(self.execution_history)
+            if not total_executions:
+                return {"total_executions": 0}
             
-            # Accumulate processing time
-            total_time += entry["processing_time"]
-            
-            # Count successful executions
-            if status in ["approved", "completed"]:
-                successful += 1
-        
-        # Calculate averages
-        stats["average_processing_time"] = total_time / len(self.execution_history)
-        stats["success_rate"] = successful / len(self.execution_history)
-        
-        return stats
+            totals = self._history_totals
+            return {
+                "total_executions": total_executions,
+                "by_workflow_type": dict(totals["by_workflow_type"]),
+                "by_status": dict(totals["by_status"]),
+                "average_processing_time": totals["total_time"] / total_executions,
+                "success_rate": totals["successful"] / total_executions
+            }
     
     def validate_workflow_config(self, workflow_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
         """
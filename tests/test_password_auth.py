@@ -0,0 +1,162 @@
+"""
+Tests for password hashing schemes, verification caching and login handling
+"""
+import json
+from datetime import timedelta
+
+import pytest
+
+from auth import AuthManager, PasswordUtils, UserRole
+from auth import password_utils
+
+PASSWORD = "Corr3ct!Horse"
+
+
+@pytest.fixture(autouse=True)
+def clear_verification_cache():
+    PasswordUtils.clear_verification_cache()
+    yield
+    PasswordUtils.clear_verification_cache()
+
+
+@pytest.fixture
+def auth_manager(tmp_path):
+    manager = AuthManager(str(tmp_path / "users.json"))
+    ok, message = manager.create_user("alice", PASSWORD, "alice@example.com", UserRole.PROCESSOR)
+    assert ok, message
+    yield manager
+    manager.close()
+
+
+@pytest.mark.parametrize("make_hash", [
+    pytest.param(lambda salt: PasswordUtils.hash_password(PASSWORD, salt), id="default-scrypt"),
+    pytest.param(lambda salt: PasswordUtils.hash_password(PASSWORD, salt, "sha256"), id="pbkdf2-sha256"),
+    pytest.param(lambda salt: PasswordUtils.hash_password(PASSWORD, salt, "sha512"), id="pbkdf2-sha512"),
+    pytest.param(lambda salt: PasswordUtils.hash_password_pbkdf2(PASSWORD, salt), id="legacy-bare-hex"),
+])
+def test_each_scheme_verifies(make_hash):
+    salt = PasswordUtils.generate_salt()
+    stored_hash = make_hash(salt)
+    
+    assert PasswordUtils.verify_password(PASSWORD, stored_hash, salt)
+    assert not PasswordUtils.verify_password(PASSWORD + "x", stored_hash, salt)
+    assert not PasswordUtils.verify_password(PASSWORD, stored_hash, PasswordUtils.generate_salt())
+
+
+def test_hash_formats():
+    salt = PasswordUtils.generate_salt()
+    assert PasswordUtils.hash_password(PASSWORD, salt).startswith("scrypt$")
+    assert PasswordUtils.hash_password(PASSWORD, salt, "sha256").startswith("sha256$600000$")
+    assert "$" not in PasswordUtils.hash_password_pbkdf2(PASSWORD, salt)
+
+
+def test_malformed_hash_is_rejected():
+    salt = PasswordUtils.generate_salt()
+    assert not PasswordUtils.verify_password(PASSWORD, "md5$1$abcd", salt)
+    assert not PasswordUtils.verify_password(PASSWORD, "sha256$many$abcd", salt)
+
+
+def test_needs_rehash():
+    salt = PasswordUtils.generate_salt()
+    assert not PasswordUtils.needs_rehash(PasswordUtils.hash_password(PASSWORD, salt))
+    assert PasswordUtils.needs_rehash(PasswordUtils.hash_password(PASSWORD, salt, "sha256"))
+    assert PasswordUtils.needs_rehash(PasswordUtils.hash_password_pbkdf2(PASSWORD, salt))
+
+
+def test_wrong_password_rejected_after_cached_success():
+    password_hash, salt = PasswordUtils.create_password_hash(PASSWORD)
+    assert PasswordUtils.verify_password(PASSWORD, password_hash, salt)
+    assert password_utils._verify_cache
+    
+    assert not PasswordUtils.verify_password("Wr0ng!Password", password_hash, salt)
+    # The cached success still holds for the right password
+    assert PasswordUtils.verify_password(PASSWORD, password_hash, salt)
+
+
+def test_legacy_hash_is_upgraded_on_login(auth_manager):
+    user = auth_manager.get_user("alice")
+    user.salt = PasswordUtils.generate_salt()
+    user.password_hash = PasswordUtils.hash_password_pbkdf2(PASSWORD, user.salt)
+    auth_manager._save_users()
+    
+    ok, _, user = auth_manager.authenticate("alice", PASSWORD)
+    assert ok
+    assert user.password_hash.startswith("scrypt$")
+    
+    stored = json.loads(auth_manager.users_file.read_text())["alice"]
+    assert stored["password_hash"] == user.password_hash
+    assert stored["salt"] == user.salt
+    
+    reloaded = AuthManager(str(auth_manager.users_file))
+    try:
+        assert reloaded.authenticate("alice", PASSWORD)[0]
+    finally:
+        reloaded.close()
+
+
+def test_change_password_invalidates_cache(auth_manager):
+    assert auth_manager.authenticate("alice", PASSWORD)[0]
+    assert password_utils._verify_cache
+    
+    new_password = "N3w!Passphrase"
+    ok, message = auth_manager.change_password("alice", PASSWORD, new_password)
+    assert ok, message
+    assert not password_utils._verify_cache
+    
+    assert not auth_manager.authenticate("alice", PASSWORD)[0]
+    assert auth_manager.authenticate("alice", new_password)[0]
+
+
+def test_change_password_rejects_wrong_current_password(auth_manager):
+    ok, message = auth_manager.change_password("alice", "Wr0ng!Password", "N3w!Passphrase")
+    assert not ok
+    assert message == "Current password is incorrect"
+    assert auth_manager.authenticate("alice", PASSWORD)[0]
+
+
+def test_lockout_and_expiry(auth_manager):
+    for _ in range(auth_manager.max_failed_attempts):
+        ok, message, _ = auth_manager.authenticate("alice", "Wr0ng!Password")
+        assert not ok
+        assert message == "Invalid username or password"
+    
+    # Locked: even the right password is refused
+    ok, message, _ = auth_manager.authenticate("alice", PASSWORD)
+    assert not ok
+    assert "locked" in message
+    
+    # Move the failure window back past the lockout duration
+    count, first_failure = auth_manager._lock_state["alice"]
+    auth_manager._lock_state["alice"] = (
+        count, first_failure - auth_manager.lockout_duration - timedelta(seconds=1)
+    )
+    ok, _, _ = auth_manager.authenticate("alice", PASSWORD)
+    assert ok
+    assert "alice" not in auth_manager._lock_state
+
+
+def test_failures_below_limit_do_not_lock(auth_manager):
+    for _ in range(auth_manager.max_failed_attempts - 1):
+        auth_manager.authenticate("alice", "Wr0ng!Password")
+    assert auth_manager.authenticate("alice", PASSWORD)[0]
+
+
+def test_inactive_user_cannot_log_in(auth_manager):
+    assert auth_manager.deactivate_user("alice")[0]
+    ok, message, _ = auth_manager.authenticate("alice", PASSWORD)
+    assert not ok
+    assert message == "Account is disabled"
+    
+    assert auth_manager.activate_user("alice")[0]
+    assert auth_manager.authenticate("alice", PASSWORD)[0]
+
+
+def test_last_login_is_flushed(auth_manager):
+    ok, _, user = auth_manager.authenticate("alice", PASSWORD)
+    assert ok
+    assert "alice" in auth_manager._dirty_last_login
+    
+    auth_manager.close()
+    stored = json.loads(auth_manager.users_file.read_text())["alice"]
+    assert stored["last_login"] == user.last_login.isoformat()
+    assert not auth_manager._dirty_last_login
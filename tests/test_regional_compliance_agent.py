@@ -0,0 +1,66 @@
+"""
+Tests for approval tier selection at every regional limit
+"""
+from datetime import datetime
+
+import pytest
+
+from agents.regional_compliance_agent import RegionalComplianceAgent
+from config.regional_rules import REGIONAL_RULES
+from models.invoice_model import Invoice
+
+EPSILON = 0.01
+
+# Limits are inclusive: an amount at a limit stays in that tier, anything above moves up
+TIER_BOUNDARIES = (
+    ("auto_approve_limit", ("system", "auto"), ("manager", "manager")),
+    ("manager_approval_limit", ("manager", "manager"), ("executive", "executive")),
+    ("executive_approval_limit", ("executive", "executive"), ("board", "board")),
+)
+
+
+def boundary_cases():
+    for region, rules in REGIONAL_RULES.items():
+        limits = rules["approval_rules"]
+        for limit_name, at_limit, above_limit in TIER_BOUNDARIES:
+            limit = limits[limit_name]
+            yield pytest.param(region, limit, at_limit, id=f"{region}-{limit_name}")
+            yield pytest.param(region, limit + EPSILON, above_limit, id=f"{region}-{limit_name}+eps")
+
+
+@pytest.fixture(scope="module")
+def agent():
+    return RegionalComplianceAgent()
+
+
+def make_invoice(amount, region):
+    return Invoice(
+        invoice_number="INV-001", date=datetime.now(), vendor_name="Acme Corp",
+        buyer_name="Globex Inc", line_items=[], currency="USD", subtotal=amount,
+        total_tax=0.0, total_amount=amount, region=region,
+    )
+
+
+@pytest.mark.parametrize("region,amount,expected", list(boundary_cases()))
+def test_approval_tier_at_limits(agent, region, amount, expected):
+    approval_info = agent._determine_approval_requirements(make_invoice(amount, region), region)
+    assert (approval_info["required_approver"], approval_info["approval_level"]) == expected
+    assert approval_info["amount"] == amount
+
+
+@pytest.mark.parametrize("region", list(REGIONAL_RULES))
+def test_approval_reasons_name_the_exceeded_limit(agent, region):
+    limits = REGIONAL_RULES[region]["approval_rules"]
+    
+    approval_info = agent._determine_approval_requirements(make_invoice(1.0, region), region)
+    assert approval_info["reason"] == "Within auto-approval limits"
+    
+    amount = limits["manager_approval_limit"] + EPSILON
+    approval_info = agent._determine_approval_requirements(make_invoice(amount, region), region)
+    assert approval_info["reason"] == f"Amount exceeds manager approval limit ({limits['manager_approval_limit']})"
+
+
+def test_zero_amount_needs_manual_approval(agent):
+    approval_info = agent._determine_approval_requirements(make_invoice(0.0, "US"), "US")
+    assert approval_info["approval_level"] == "manual"
+    assert approval_info["reason"] == "Total amount is missing or zero"
@@ -0,0 +1,181 @@
+"""
+Tests for the journaled session store
+"""
+import json
+import time
+
+import pytest
+
+from auth.session_manager import Session, SessionManager
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """Build SessionManagers on a temp sessions file and close them after the test"""
+    managers = []
+    
+    def factory(sessions_file=None):
+        manager = SessionManager(str(sessions_file or tmp_path / "sessions.log"))
+        managers.append(manager)
+        return manager
+    
+    yield factory
+    for manager in managers:
+        manager.close()
+
+
+def assert_index_consistent(manager):
+    """Every live session has exactly one row and every row points back at its session"""
+    assert sorted(manager._row_ids) == sorted(manager.sessions)
+    for session_id, row in manager._rows.items():
+        assert manager._row_ids[row] == session_id
+        assert manager._expires[row] == manager.sessions[session_id].expires_at
+        assert manager._last_activity[row] == manager.sessions[session_id].last_activity
+
+
+def test_sessions_survive_restart(make_manager):
+    manager = make_manager()
+    session_id = manager.create_session("alice")
+    assert manager.get_session(session_id).username == "alice"
+    manager.close()
+    
+    reloaded = make_manager()
+    session = reloaded.get_session(session_id)
+    assert session is not None
+    assert session.username == "alice"
+
+
+def test_destroyed_session_is_not_resurrected(make_manager):
+    manager = make_manager()
+    session_id = manager.create_session("alice")
+    # Queue a put record, then destroy before the flusher writes it
+    manager.get_session(session_id)
+    manager.destroy_session(session_id)
+    assert manager.get_session(session_id) is None
+    manager.close()
+    
+    reloaded = make_manager()
+    assert reloaded.get_session(session_id) is None
+    assert session_id not in reloaded.sessions
+
+
+def test_destroy_user_sessions_persists(make_manager):
+    manager = make_manager()
+    kept = manager.create_session("bob")
+    manager.create_session("alice")
+    manager.create_session("alice")
+    manager.destroy_user_sessions("alice")
+    manager.close()
+    
+    reloaded = make_manager()
+    assert list(reloaded.sessions) == [kept]
+
+
+def test_compaction_keeps_one_record_per_session(make_manager, tmp_path):
+    manager = make_manager()
+    manager.compact_ratio = 2
+    session_ids = [manager.create_session(f"user{i}") for i in range(3)]
+    for _ in range(5):
+        for session_id in session_ids:
+            manager.get_session(session_id)
+        manager.flush()
+    
+    lines = (tmp_path / "sessions.log").read_bytes().splitlines()
+    assert len(lines) <= manager.compact_ratio * len(session_ids)
+    manager.close()
+    
+    reloaded = make_manager()
+    assert sorted(reloaded.sessions) == sorted(session_ids)
+
+
+def test_second_manager_follows_compacted_journal(make_manager):
+    first = make_manager()
+    second = make_manager()
+    first.create_session("alice")
+    first.flush()
+    
+    # first replaces the journal file; second must append to the new one
+    first._compact()
+    session_id = second.create_session("bob")
+    second.flush()
+    
+    reloaded = make_manager()
+    assert reloaded.sessions[session_id].username == "bob"
+
+
+def test_torn_final_line_only_loses_that_record(make_manager, tmp_path):
+    manager = make_manager()
+    session_id = manager.create_session("alice")
+    manager.close()
+    
+    with open(tmp_path / "sessions.log", "ab") as f:
+        f.write(b'{"op": "put", "session": {"session_id": "tor')
+    
+    reloaded = make_manager()
+    assert list(reloaded.sessions) == [session_id]
+    
+    # Appends after the torn line still load on the next restart
+    other_id = reloaded.create_session("bob")
+    reloaded.close()
+    assert sorted(make_manager().sessions) == sorted([session_id, other_id])
+
+
+def test_cleanup_removes_expired_and_inactive_sessions(make_manager):
+    manager = make_manager()
+    session_ids = [manager.create_session(f"user{i}") for i in range(5)]
+    now = time.time()
+    
+    # Expire one in the middle and the last, and make the first inactive, so
+    # removals exercise the move-last-row-into-the-gap path
+    manager.sessions[session_ids[2]].expires_at = now - 1
+    manager.sessions[session_ids[4]].expires_at = now - 1
+    manager.sessions[session_ids[0]].last_activity = now - manager.inactive_timeout.total_seconds() - 1
+    for session_id in (session_ids[0], session_ids[2], session_ids[4]):
+        manager._index_session(manager.sessions[session_id])
+    
+    manager._cleanup_sessions()
+    
+    assert sorted(manager.sessions) == sorted([session_ids[1], session_ids[3]])
+    assert_index_consistent(manager)
+
+
+def test_cleanup_tolerates_stale_index_row(make_manager):
+    manager = make_manager()
+    session_id = manager.create_session("alice")
+    session = manager.sessions[session_id]
+    manager.destroy_session(session_id)
+    
+    # A row for a session no longer in the dict must not break the sweep
+    session.expires_at = time.time() - 1
+    manager._index_session(session)
+    manager._cleanup_sessions()
+    
+    assert session_id not in manager._rows
+    assert_index_consistent(manager)
+
+
+def test_get_session_drops_expired_session(make_manager):
+    manager = make_manager()
+    session_id = manager.create_session("alice")
+    manager.sessions[session_id].expires_at = time.time() - 1
+    
+    assert manager.get_session(session_id) is None
+    assert session_id not in manager.sessions
+    assert_index_consistent(manager)
+
+
+def test_legacy_sessions_json_is_imported(make_manager, tmp_path):
+    live = Session("live-session", "alice")
+    expired = Session("expired-session", "bob", expires_at=time.time() - 60)
+    legacy = {session.session_id: session.to_dict() for session in (live, expired)}
+    (tmp_path / "sessions.json").write_text(json.dumps(legacy))
+    
+    manager = make_manager()
+    assert list(manager.sessions) == ["live-session"]
+    assert manager.sessions["live-session"].username == "alice"
+    assert (tmp_path / "sessions.log").exists()
+    manager.close()
+    
+    # The journal now takes precedence over the legacy file
+    (tmp_path / "sessions.json").unlink()
+    assert list(make_manager().sessions) == ["live-session"]
@@ -0,0 +1,140 @@
+"""
+Regression tests for validation scoring; expected scores come from the
+per-check validators the agent used before failures-only scoring
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from agents.validation_agent import ValidationAgent
+from models.invoice_model import Invoice, InvoiceLineItem, ProcessingStatus
+
+
+@pytest.fixture(scope="module")
+def agent():
+    return ValidationAgent()
+
+
+def set_field(obj, name, value):
+    """Overwrite a field, bypassing frozen dataclasses and model validation"""
+    object.__setattr__(obj, name, value)
+
+
+def make_invoice(line_items=None, **overrides):
+    """A consistent invoice: 10 x 25.00 + 2 x 150.00, 10% tax"""
+    if line_items is None:
+        line_items = [
+            InvoiceLineItem("Widgets", 10, 25.0, 250.0),
+            InvoiceLineItem("Consulting", 2, 150.0, 300.0),
+        ]
+    fields = dict(
+        invoice_number="INV-001",
+        date=datetime.now() - timedelta(days=10),
+        due_date=datetime.now() + timedelta(days=20),
+        vendor_name="Acme Corp",
+        vendor_email="billing@acme.com",
+        buyer_name="Globex Inc",
+        line_items=line_items,
+        currency="USD",
+        subtotal=550.0,
+        total_tax=55.0,
+        total_amount=605.0,
+        region="US",
+    )
+    fields.update(overrides)
+    return Invoice(**fields)
+
+
+def validate(agent, invoice):
+    result = agent.process(invoice)
+    assert not any(error.startswith("Validation failed") for error in result.errors)
+    return result
+
+
+def test_clean_invoice(agent):
+    result = validate(agent, make_invoice())
+    assert result.confidence_score == pytest.approx(1.0)
+    assert result.errors == []
+    assert result.warnings == []
+
+
+def test_tax_mismatch(agent):
+    invoice = make_invoice()
+    set_field(invoice, "total_amount", 650.0)
+    
+    result = validate(agent, invoice)
+    assert result.confidence_score == pytest.approx(0.8)
+    assert len(result.errors) == 1
+    assert "Calculated total" in result.errors[0]
+    assert invoice.processing_status == ProcessingStatus.VALIDATED
+
+
+def test_line_item_mismatch(agent):
+    invoice = make_invoice()
+    set_field(invoice.line_items[1], "total", 250.0)
+    
+    result = validate(agent, invoice)
+    # The item mismatch and the subtotal mismatch it causes
+    assert result.confidence_score == pytest.approx(2 / 3)
+    assert len(result.errors) == 2
+    assert invoice.processing_status == ProcessingStatus.ERROR
+
+
+def test_nan_line_item_fails_no_check(agent):
+    invoice = make_invoice()
+    set_field(invoice.line_items[1], "quantity", float("nan"))
+    
+    result = validate(agent, invoice)
+    assert result.confidence_score == pytest.approx(1.0)
+    assert result.errors == []
+
+
+def test_missing_line_item_value(agent):
+    invoice = make_invoice()
+    set_field(invoice.line_items[0], "quantity", None)
+    
+    result = validate(agent, invoice)
+    assert result.confidence_score == pytest.approx(0.8125)
+    assert result.errors == ["Validation error: Line item 1: has missing quantity, price, or total"]
+
+
+def test_empty_line_items(agent):
+    result = validate(agent, make_invoice(line_items=[]))
+    assert result.confidence_score == pytest.approx(0.9571428571428572)
+    assert result.warnings == ["Validation warning: No line items found"]
+
+
+def test_warnings_earn_partial_credit(agent):
+    invoice = make_invoice(
+        line_items=[InvoiceLineItem("Wd", 10, 25.0, 250.0)],
+        subtotal=250.0, total_tax=0.0, total_amount=250.0,
+        currency="XYZ", buyer_name="acme corp", vendor_email="bad",
+    )
+    result = validate(agent, invoice)
+    assert result.confidence_score == pytest.approx(0.8736842105263158)
+    assert result.errors == []
+    assert len(result.warnings) == 4
+
+
+def test_cache_hit_returns_same_score(agent):
+    agent._validation_cache.clear()
+    invoice = make_invoice()
+    set_field(invoice, "total_amount", 650.0)
+    
+    first = validate(agent, invoice)
+    assert len(agent._validation_cache) == 1
+    second = validate(agent, invoice)
+    assert len(agent._validation_cache) == 1
+    assert second.confidence_score == first.confidence_score
+    assert second.errors == first.errors
+    
+    # A field the validators read is part of the key, so a fix is not masked
+    set_field(invoice, "total_amount", 605.0)
+    assert validate(agent, invoice).confidence_score == pytest.approx(1.0)
+    assert len(agent._validation_cache) == 2
+
+
+def test_batch_matches_single_results(agent):
+    invoices = [make_invoice(), make_invoice(line_items=[])]
+    results = agent.process_batch(invoices)
+    assert [result.confidence_score for result in results] == pytest.approx([1.0, 0.9571428571428572])
@@ -2,10 +2,11 @@
 Login component for the invoice processing system
 """
 import streamlit as st
+from datetime import datetime
 from typing import Optional
 
 from auth import AuthManager, UserRole
-from auth.session_manager import SessionManager, StreamlitSessionManager
+from auth.session_manager import SessionManager, StreamlitSessionManager, get_session_manager
 
 
 class LoginComponent:
@@ -13,7 +14,7 @@ class LoginComponent:
     
     def __init__(self):
         self.auth_manager = AuthManager()
-        self.session_manager = SessionManager()
+        self.session_manager = get_session_manager()
         self.streamlit_session = StreamlitSessionManager(self.session_manager)
     
     def render_login_form(self) -> bool:
@@ -163,8 +164,9 @@ class LoginComponent:
 class AdminComponent:
     """Admin panel for user management"""
     
-    def __init__(self, auth_manager: AuthManager):
+    def __init__(self, auth_manager: AuthManager, session_manager: Optional[SessionManager] = None):
         self.auth_manager = auth_manager
+        self.session_manager = session_manager or get_session_manager()
     
     def render_admin_panel(self):
         """Render admin panel"""
@@ -266,7 +268,7 @@ class AdminComponent:
         """Render sessions information"""
         st.subheader("📊 Active Sessions")
         
-        session_manager = SessionManager()
+        session_manager = self.session_manager
         active_sessions = session_manager.get_active_sessions()
         
         if not active_sessions:
@@ -282,8 +284,8 @@ class AdminComponent:
                     st.caption(f"Session: {session.session_id[:8]}...")
                 
                 with col2:
-                    st.write(f"Created: {session.created_at.strftime('%Y-%m-%d %H:%M')}")
-                    st.caption(f"Last Activity: {session.last_activity.strftime('%Y-%m-%d %H:%M')}")
+                    st.write(f"Created: {datetime.fromtimestamp(session.created_at).strftime('%Y-%m-%d %H:%M')}")
+                    st.caption(f"Last Activity: {datetime.fromtimestamp(session.last_activity).strftime('%Y-%m-%d %H:%M')}")
                 
                 with col3:
                     if st.button("End", key=f"end_{session.session_id}"):
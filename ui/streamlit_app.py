@@ -3,6 +3,7 @@ Streamlit App - Main user interface for invoice processing system
 """
 import streamlit as st
 import sys
+import threading
 from pathlib import Path
 
 # Add project root to path
@@ -30,6 +31,8 @@ def initialize_components():
     """Initialize system components"""
     if st.session_state.agent_coordinator is None:
         st.session_state.agent_coordinator = AgentCoordinator()
+        # Load the model in the background so the first upload doesn't pay for it
+        threading.Thread(target=st.session_state.agent_coordinator.warmup, daemon=True).start()
     if st.session_state.workflow_manager is None:
         st.session_state.workflow_manager = WorkflowManager(st.session_state.agent_coordinator)
 
@@ -2,13 +2,59 @@
 Ollama client for local LLM inference and embeddings
 """
 import json
+import time
 import requests
-from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Optional, Union
 from config.settings import settings
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Bump when the extraction or validation prompts change so cached extractions are not reused
+EXTRACTION_PROMPT_VERSION = "2"
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes with orjson when available"""
+    return orjson.dumps(obj) if ORJSON_AVAILABLE else json.dumps(obj).encode('utf-8')
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON with orjson when available; both raise json.JSONDecodeError subclasses"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+@lru_cache(maxsize=64)
+def _extraction_system_prompt(schema_json: bytes) -> str:
+    """Build the extraction system prompt for a schema, given as compact JSON"""
+    # Indented dumps go through the pure-Python encoder, so only do it once per schema
+    return f"""You are an expert invoice data extraction AI powered by Qwen2.5. Your task is to extract structured information from invoice documents.
+
+SCHEMA:
+{json.dumps(json.loads(schema_json), indent=2)}
+
+EXTRACTION RULES:
+1. Extract ONLY information explicitly present in the text
+2. Use null for missing optional fields  
+3. Ensure all required fields have values
+4. Follow exact field names and data types from schema
+5. For dates, use ISO format (YYYY-MM-DD)
+6. For numbers, use decimal format (e.g., 1234.56)
+7. For currency, extract numeric value only
+8. Be precise with company names, addresses, and invoice numbers
+
+OUTPUT FORMAT:
+Return ONLY a valid JSON object matching the schema. No explanations, no markdown, no additional text."""
+
 
 class OllamaClient:
     """Client for interacting with Ollama API"""
@@ -18,18 +64,45 @@ class OllamaClient:
         self.model = model or settings.OLLAMA_MODEL
         self.embedding_model = embedding_model or settings.OLLAMA_EMBEDDING_MODEL
         self.session = requests.Session()
+        
+        # Keep one alive connection per concurrent request the client may be shared by
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.OLLAMA_NUM_PARALLEL
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # (monotonic time, result) of the last ping
+        self._ping_cache = (float("-inf"), False)
 
     def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Make a request to Ollama API"""
         try:
             url = f"{self.base_url}/api/{endpoint}"
-            response = self.session.post(url, json=data, timeout=60)
+            response = self.session.post(
+                url, data=_dumps(data), headers={"Content-Type": "application/json"}, timeout=60
+            )
             response.raise_for_status()
-            return response.json()
+            return _loads(response.content)
         except requests.exceptions.RequestException as e:
             logger.error(f"Ollama API request failed: {e}")
             raise
 
+    def ping(self, timeout: float = 0.5, max_age: float = 5.0) -> bool:
+        """Check that the Ollama server answers, reusing the last answer for max_age seconds"""
+        now = time.monotonic()
+        checked_at, reachable = self._ping_cache
+        if now - checked_at < max_age:
+            return reachable
+        
+        # Listing local models is a metadata lookup, no inference
+        try:
+            reachable = self.session.get(f"{self.base_url}/api/tags", timeout=timeout).ok
+        except requests.exceptions.RequestException:
+            reachable = False
+        self._ping_cache = (now, reachable)
+        return reachable
+
     def generate(self, prompt: str, model: str = None, system: str = None,
                  context: List[int] = None, options: Dict[str, Any] = None) -> str:
         """Generate text completion"""
@@ -53,6 +126,16 @@ class OllamaClient:
             logger.error(f"Text generation failed: {e}")
             return ""
 
+    def load_model(self, model: str = None) -> bool:
+        """Load a model into Ollama's memory ahead of its first real request"""
+        # A generate request without a prompt only loads the model
+        try:
+            response = self._make_request("generate", {"model": model or self.model, "stream": False})
+            return bool(response.get("done"))
+        except Exception as e:
+            logger.warning(f"Model preload failed: {e}")
+            return False
+
     def chat(self, messages: List[Dict[str, str]], model: str = None,
              options: Dict[str, Any] = None) -> str:
         """Chat completion"""
@@ -97,24 +180,20 @@ class OllamaClient:
     def extract_structured_data(self, text: str, schema: Dict[str, Any],
                                 model: str = None) -> Dict[str, Any]:
         """Extract structured data from text using JSON schema optimized for Qwen2.5"""
-        system_prompt = f"""You are an expert invoice data extraction AI powered by Qwen2.5. Your task is to extract structured information from invoice documents.
+        return self._extract_with_prompt(_extraction_system_prompt(_dumps(schema)), text, model)
 
-SCHEMA:
-{json.dumps(schema, indent=2)}
+    def compile_extractor(self, schema: Dict[str, Any],
+                          model: str = None) -> Callable[[str], Dict[str, Any]]:
+        """Specialize extract_structured_data to one schema, rendering its prompt only once"""
+        system_prompt = _extraction_system_prompt(_dumps(schema))
 
-EXTRACTION RULES:
-1. Extract ONLY information explicitly present in the text
-2. Use null for missing optional fields  
-3. Ensure all required fields have values
-4. Follow exact field names and data types from schema
-5. For dates, use ISO format (YYYY-MM-DD)
-6. For numbers, use decimal format (e.g., 1234.56)
-7. For currency, extract numeric value only
-8. Be precise with company names, addresses, and invoice numbers
+        def extract(text: str) -> Dict[str, Any]:
+            return self._extract_with_prompt(system_prompt, text, model)
 
-OUTPUT FORMAT:
-Return ONLY a valid JSON object matching the schema. No explanations, no markdown, no additional text."""
+        return extract
 
+    def _extract_with_prompt(self, system_prompt: str, text: str, model: str = None) -> Dict[str, Any]:
+        """Extract structured data from text with an already rendered system prompt"""
         user_prompt = f"""Extract invoice data from this text:
 
 {text}
@@ -140,7 +219,7 @@ Respond with JSON only:"""
                     clean_response = clean_response[:-3]
                 clean_response = clean_response.strip()
                 
-                return json.loads(clean_response)
+                return _loads(clean_response)
             except json.JSONDecodeError as je:
                 logger.error(f"Failed to parse LLM JSON response: {je}")
                 # Enhanced JSON extraction with multiple strategies
@@ -151,7 +230,7 @@ Respond with JSON only:"""
                 if json_match:
                     try:
                         json_str = json_match.group()
-                        return json.loads(json_str)
+                        return _loads(json_str)
                     except json.JSONDecodeError:
                         logger.debug("Strategy 1 failed, trying strategy 2")
                 
@@ -161,7 +240,7 @@ Respond with JSON only:"""
                 if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
                     try:
                         json_str = response[first_brace:last_brace + 1]
-                        return json.loads(json_str)
+                        return _loads(json_str)
                     except json.JSONDecodeError:
                         logger.debug("Strategy 2 failed, trying strategy 3")
                 
@@ -185,7 +264,7 @@ Respond with JSON only:"""
                 if json_lines:
                     try:
                         json_str = '\n'.join(json_lines)
-                        return json.loads(json_str)
+                        return _loads(json_str)
                     except json.JSONDecodeError:
                         logger.debug("Strategy 3 failed")
                 
@@ -214,7 +293,7 @@ Return a JSON object with validation results:
 {text}
 
 Extracted data:
-{json.dumps(extracted_data, indent=2)}
+{_dumps(extracted_data).decode('utf-8')}
 
 Validate the extraction accuracy:"""
 
@@ -235,7 +314,7 @@ Validate the extraction accuracy:"""
                     clean_response = clean_response[:-3]
                 clean_response = clean_response.strip()
                 
-                return json.loads(clean_response)
+                return _loads(clean_response)
             except json.JSONDecodeError:
                 return {
                     "is_valid": False,
@@ -0,0 +1,67 @@
+"""
+Content-addressed on-disk cache for LLM pipeline results
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Union[str, bytes]) -> str:
+    """Hash parts into a cache key; each is length-prefixed so ("ab", "c") != ("a", "bc")"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class PipelineCache:
+    """JSON file per key under a cache directory, expired by file age"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: Optional[float] = None):
+        self.cache_dir = Path(cache_dir or settings.PIPELINE_CACHE_DIR)
+        self.ttl = settings.PIPELINE_CACHE_TTL if ttl is None else ttl
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing, expired or unreadable"""
+        path = self._path(key)
+        try:
+            if self.ttl > 0 and time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path.name}: {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value; the file is replaced atomically so readers never see a partial entry"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
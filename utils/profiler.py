@@ -0,0 +1,53 @@
+"""
+Lightweight latency profiler for pipeline stages
+"""
+import threading
+from typing import Any, Dict
+
+
+class Profiler:
+    """Thread-safe call count, failure count and min/avg/max latency per named span"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, elapsed: float, ok: bool = True) -> None:
+        """Record one call of a span that took elapsed seconds"""
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                span = self._spans[name] = {
+                    "calls": 0, "failures": 0, "total": 0.0, "min": elapsed, "max": elapsed
+                }
+            span["calls"] += 1
+            span["total"] += elapsed
+            if not ok:
+                span["failures"] += 1
+            if elapsed < span["min"]:
+                span["min"] = elapsed
+            if elapsed > span["max"]:
+                span["max"] = elapsed
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-span statistics in seconds, slowest total first so the bottleneck leads"""
+        with self._lock:
+            spans = [(name, dict(span)) for name, span in self._spans.items()]
+
+        spans.sort(key=lambda item: item[1]["total"], reverse=True)
+        return {
+            name: {
+                "calls": span["calls"],
+                "failure_rate": span["failures"] / span["calls"],
+                "min_time": span["min"],
+                "average_time": span["total"] / span["calls"],
+                "max_time": span["max"],
+                "total_time": span["total"]
+            }
+            for name, span in spans
+        }
+
+    def reset(self) -> None:
+        """Forget all recorded spans"""
+        with self._lock:
+            self._spans.clear()